@@ -0,0 +1,310 @@
+# benchmark.py
+"""
+Synthetic benchmark for extract_app_data.py.
+
+Generates source workbooks shaped like the config's sources (same sheets,
+ID columns and every column the fields reference), then measures:
+  - source load (parse + column check + index build)
+  - per-aggregate render time (row lookup and aggregation, per ID)
+  - per-ID latency of extract_fields() after sources are resident
+  - in-process batch (batch engine + one extract_fields per ID)
+  - end-to-end CLI batch run (subprocess, includes imports and parsing)
+  - peak RSS
+
+Results are written as JSON; pass --compare to diff against an earlier run.
+
+Example:
+  python benchmark.py --apps 2000 --servers-per-app 6 --out bench.json
+  python benchmark.py --apps 2000 --compare bench.json
+"""
+import argparse, json, os, sys, time, random, shutil, subprocess, tempfile, platform, contextlib
+import openpyxl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import extract_app_data as ead
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENV_VALUES = ["Production", "PROD", "prd", "Test", "tst", "UAT", "Dev", "development", "Staging", None]
+OS_NAMES = ["Red Hat Enterprise Linux", "Windows Server", "AIX", "SUSE Linux", None]
+HOST_ROLES = ["app", "web", "db", "sql", "ora", "mq", "batch"]
+
+# ------------------------
+# Synthetic data
+# ------------------------
+def bench_config(config_path, work_dir):
+    """The template config with every source pointed at a workbook in work_dir."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    for alias, src in cfg["sources"].items():
+        src["path"] = os.path.join(work_dir, f"{alias}.xlsx")
+    return cfg
+
+def column_roles(cfg, alias):
+    """Column -> role ("owner", "peer", "env", "server", "os_name", "os_version", or "text")."""
+    src = cfg["sources"][alias]
+    roles = {}
+    for fld in cfg.get("fields", []):
+        if fld.get("source") != alias:
+            continue
+        agg = fld.get("aggregate")
+        if agg == "dependencies":
+            roles.setdefault(fld["return_column"], "peer")
+        elif agg == "group_by":
+            roles.setdefault(fld["group_by_column"], "env")
+            roles.setdefault(fld["value_column"], "server")
+        elif agg in ("inventory_summary", "inventory_table"):
+            env_col, server_col, os_col, ver_col = ead._inventory_columns(fld)
+            roles.setdefault(env_col, "env")
+            roles.setdefault(server_col, "server")
+            roles.setdefault(os_col, "os_name")
+            roles.setdefault(ver_col, "os_version")
+            for col in fld.get("columns", []):
+                roles.setdefault(col, "text")
+        if fld.get("column"):
+            roles.setdefault(fld["column"], "text")
+    roles[src.get("id_column_default")] = "owner"
+    return roles
+
+def cell(role, column, app_id, app_ids, rnd):
+    if role == "owner":
+        return app_id
+    if role == "peer":
+        return rnd.choice(app_ids)
+    if rnd.random() < 0.05:
+        return None
+    if role == "env":
+        return rnd.choice(ENV_VALUES)
+    if role == "server":
+        return f"srv{rnd.choice(HOST_ROLES)}{rnd.randint(1, 400):03d}"
+    if role == "os_name":
+        return rnd.choice(OS_NAMES)
+    if role == "os_version":
+        return rnd.choice(["7.9", "8.6", "2016", "2019", "7.2", None])
+    return f"{column} {rnd.randint(1, 50)}"
+
+def generate_workbooks(cfg, apps, rows_per_app, seed=0):
+    """
+    Write one workbook per source. rows_per_app: alias -> rows for each app
+    (sources not listed get one row per app). Returns the generated app IDs.
+    """
+    rnd = random.Random(seed)
+    app_ids = [100000 + i for i in range(apps)]
+    for alias, src in cfg["sources"].items():
+        roles = column_roles(cfg, alias)
+        columns = list(roles)
+        sheet = src.get("sheet_name_default") or "Sheet1"
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(sheet)
+        ws.append(columns)
+        for app_id in app_ids:
+            for _ in range(rows_per_app.get(alias, 1)):
+                ws.append([cell(roles[c], c, app_id, app_ids, rnd) for c in columns])
+        wb.save(src["path"])
+    return app_ids
+
+# ------------------------
+# Measurements
+# ------------------------
+def peak_rss_mb(who="self"):
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KiB elsewhere
+    return round(usage.ru_maxrss / scale, 1)
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return {}
+    s = sorted(samples_ms)
+    pick = lambda q: s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+    return {"n": len(s), "mean": round(sum(s) / len(s), 3), "p50": round(pick(0.5), 3),
+            "p90": round(pick(0.9), 3), "p99": round(pick(0.99), 3), "max": round(s[-1], 3)}
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure_load(plan):
+    registry = ead.SourceRegistry()
+    started = time.perf_counter()
+    plan.load(registry)
+    return registry, {
+        "seconds": round(time.perf_counter() - started, 4),
+        "parse_seconds": {os.path.basename(p): round(s, 4) for p, (_, s) in registry.parse_times.items()},
+        "rows": {f"{a}:{s}": len(plan.get_df(registry, a, s)) for a, _, s in plan.sheet_keys()},
+    }
+
+def measure_aggregates(plan, registry, ids):
+    """Per aggregate type: lookup + aggregate time summed over fields and IDs."""
+    totals = {}
+    for step in plan.steps:
+        name = step.aggregate or "simple"
+        t = totals.setdefault(name, {"fields": 0, "calls": 0, "seconds": 0.0})
+        t["fields"] += 1
+        for app_id in ids:
+            started = time.perf_counter()
+            if step.aggregate == "dependencies":
+                plan.dependencies(registry, step, app_id)  # graph lookup, as render_app does
+            else:
+                plan.render_step(registry, step, plan.find_rows(registry, step.lookup, app_id))
+            t["seconds"] += time.perf_counter() - started
+            t["calls"] += 1
+    for t in totals.values():
+        t["mean_us"] = round(t["seconds"] / max(t["calls"], 1) * 1e6, 1)
+        t["seconds"] = round(t["seconds"], 4)
+    return totals
+
+def measure_per_id(cfg, plan, registry, ids):
+    samples = []
+    with quiet():
+        for app_id in ids:
+            started = time.perf_counter()
+            ead.extract_fields(cfg, app_id, {}, registry=registry, plan=plan)
+            samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+def measure_batch(cfg, plan, registry, ids):
+    started = time.perf_counter()
+    precomputed = ead.precompute_fields(plan, ids, registry)
+    engine = time.perf_counter() - started
+    with quiet():
+        for app_id in ids:
+            ead.extract_fields(cfg, app_id, {}, registry=registry, precomputed=precomputed, plan=plan)
+    total = time.perf_counter() - started
+    return {"ids": len(ids), "engine_seconds": round(engine, 4), "seconds": round(total, 4),
+            "ids_per_second": round(len(ids) / total, 1) if total else None}
+
+def measure_cli(config_path, ids_path, extra_args):
+    cmd = [sys.executable, os.path.join(HERE, "extract_app_data.py"), "--config", config_path, "--ids-file", ids_path] + extra_args
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"CLI batch failed ({proc.returncode}): {proc.stderr.strip()[-500:]}")
+    return {"args": extra_args, "seconds": round(seconds, 4), "peak_rss_mb": peak_rss_mb("children")}
+
+# ------------------------
+# Reporting
+# ------------------------
+def git_revision():
+    try:
+        out = subprocess.run(["git", "-C", HERE, "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def headline(results):
+    """Flat {metric: value} of the numbers worth comparing between runs."""
+    r = results["results"]
+    flat = {"load.seconds": r["load"]["seconds"]}
+    for name, t in r["aggregates"].items():
+        flat[f"aggregate.{name}.mean_us"] = t["mean_us"]
+    for k in ("p50", "p90", "p99"):
+        if k in r["per_id_ms"]:
+            flat[f"per_id.{k}_ms"] = r["per_id_ms"][k]
+    flat["batch.seconds"] = r["batch"]["seconds"]
+    if r.get("cli"):
+        flat["cli.seconds"] = r["cli"]["seconds"]
+        flat["cli.peak_rss_mb"] = r["cli"]["peak_rss_mb"]
+    flat["peak_rss_mb"] = r["peak_rss_mb"]
+    return flat
+
+def print_summary(results, baseline=None):
+    now = headline(results)
+    before = headline(baseline) if baseline else {}
+    width = max(len(k) for k in now)
+    for key, value in now.items():
+        line = f"{key:<{width}}  {value!s:>12}"
+        old = before.get(key)
+        if isinstance(old, (int, float)) and isinstance(value, (int, float)) and old:
+            line += f"  (was {old}, x{value / old:.2f})"
+        print(line)
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark extract_app_data.py on generated workbooks.")
+    p.add_argument("--config", default=os.path.join(HERE, "config_from_user.json"),
+                   help="Config whose sources/fields shape the generated workbooks (source paths are replaced).")
+    p.add_argument("--apps", type=int, default=500, help="Number of app IDs. Default: 500")
+    p.add_argument("--servers-per-app", type=int, default=6, help="Rows per app in source B. Default: 6")
+    p.add_argument("--dbs-per-app", type=int, default=3, help="Rows per app in source C. Default: 3")
+    p.add_argument("--interfaces-per-app", type=int, default=4, help="Rows per app in source D. Default: 4")
+    p.add_argument("--sample", type=int, default=200, help="IDs timed individually for aggregate/per-ID latency. Default: 200")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--no-cli", action="store_true", help="Skip the end-to-end CLI batch run.")
+    p.add_argument("--cli-args", default="", help="Extra arguments for the CLI batch run, e.g. \"--workers 4\".")
+    p.add_argument("--work-dir", help="Keep generated workbooks and output here (default: a temp dir, removed afterwards).")
+    p.add_argument("--out", help="Write results as JSON to this path.")
+    p.add_argument("--compare", help="Earlier results JSON to compare against.")
+    args = p.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix="extract-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    cwd = os.getcwd()
+    out_path = os.path.abspath(args.out) if args.out else None
+    try:
+        cfg = bench_config(args.config, work_dir)
+        rows_per_app = {"B": args.servers_per_app, "C": args.dbs_per_app, "D": args.interfaces_per_app}
+        started = time.perf_counter()
+        app_ids = generate_workbooks(cfg, args.apps, rows_per_app, seed=args.seed)
+        generate_seconds = time.perf_counter() - started
+
+        config_path = os.path.join(work_dir, "bench_config.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=2)
+        ids_path = os.path.join(work_dir, "ids.txt")
+        with open(ids_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(str(a) for a in app_ids))
+
+        os.chdir(work_dir)  # extract_fields writes under ./output
+        sample = random.Random(args.seed).sample(app_ids, min(args.sample, len(app_ids)))
+        plan = ead.compile_plan(cfg)
+        registry, load = measure_load(plan)
+        results = {
+            "meta": {
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "pandas": ead.pd.__version__,
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "params": {
+                "apps": args.apps,
+                "rows_per_app": rows_per_app,
+                "sample": len(sample),
+                "seed": args.seed,
+                "config": os.path.basename(args.config),
+            },
+            "results": {
+                "generate_seconds": round(generate_seconds, 4),
+                "load": load,
+                "aggregates": measure_aggregates(plan, registry, sample),
+                "per_id_ms": measure_per_id(cfg, plan, registry, sample),
+                "batch": measure_batch(cfg, plan, registry, app_ids),
+            },
+        }
+        results["results"]["peak_rss_mb"] = peak_rss_mb()
+        if not args.no_cli:
+            results["results"]["cli"] = measure_cli(config_path, ids_path, args.cli_args.split())
+    finally:
+        os.chdir(cwd)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(results, baseline)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# dependency_graph.py
+"""
+Interface dependencies as adjacency lists, built once per interfaces sheet.
+
+Each row links a sending app to a receiving app. DependencyGraph keeps both
+directions keyed by normalized App ID ("down": sender -> receivers, "up":
+receiver -> senders), so a direct lookup costs O(degree) instead of a sheet
+scan, and multi-hop views walk the lists breadth-first.
+
+Input is either a pandas DataFrame or an iterable of dict rows; pandas is
+only imported for DataFrames.
+"""
+from collections import defaultdict
+
+from inventory import is_na, normalize_app_id, normalize_app_id_series
+
+def _neighbors(pairs):
+    # {key: [names]} in row order, without blanks or repeats (like stable_unique)
+    out = defaultdict(list)
+    seen = set()
+    for key, name in pairs:
+        if name and (key, name) not in seen:
+            seen.add((key, name))
+            out[key].append(name)
+    return dict(out)
+
+class DependencyGraph:
+    """
+    Directed graph over one (from column, to column) pair. Arguments are
+    per-row lists: normalized keys (NA cells folded the way the extractor's
+    indexes fold them) and display names (stripped text, None for NA).
+    """
+    def __init__(self, from_keys, from_names, to_keys, to_names, from_column="from", to_column="to", key=normalize_app_id):
+        self.from_column = from_column
+        self.to_column = to_column
+        self.key = key
+        self.down = _neighbors((f, t) for f, t in zip(from_keys, to_names) if t is not None)
+        self.up = _neighbors((t, f) for t, f in zip(to_keys, from_names) if f is not None)
+        self.names = {}  # normalized ID -> first spelling seen
+        for keys, names in ((from_keys, from_names), (to_keys, to_names)):
+            for k, name in zip(keys, names):
+                if name:
+                    self.names.setdefault(k, name)
+
+    @classmethod
+    def from_frame(cls, df, from_column, to_column, key=normalize_app_id):
+        import pandas as pd
+        cells = []
+        for col in (from_column, to_column):
+            series = df[col]
+            vals = series.to_numpy(dtype=object)
+            na = pd.isna(vals)
+            if key is normalize_app_id:
+                keys = normalize_app_id_series(series).tolist()
+            else:
+                keys = [key(v) for v in vals]
+            cells += [keys, [None if n else str(v).strip() for v, n in zip(vals, na)]]
+        return cls(*cells, from_column=from_column, to_column=to_column, key=key)
+
+    @classmethod
+    def from_rows(cls, rows, from_column, to_column, key=normalize_app_id):
+        cells = [[], [], [], []]
+        for r in rows:
+            for i, col in enumerate((from_column, to_column)):
+                v = r.get(col)
+                cells[2 * i].append(key(v))
+                cells[2 * i + 1].append(None if is_na(v) else str(v).strip())
+        return cls(*cells, from_column=from_column, to_column=to_column, key=key)
+
+    def neighbors(self, app_id, direction="down"):
+        """Direct dependencies, in source row order."""
+        adjacency = self.down if direction == "down" else self.up
+        return list(adjacency.get(self.key(app_id), ()))
+
+    def walk(self, app_id, direction="down", depth=None):
+        """
+        [(name, hops)] breadth-first from app_id, up to `depth` hops (None:
+        no limit). Every app is listed once, at its shortest distance, and
+        cycles are never revisited. The starting app appears only through a
+        self-link (at hop 1, as neighbors() lists it).
+        """
+        adjacency = self.down if direction == "down" else self.up
+        start = self.key(app_id)
+        seen = set()
+        frontier = [start]
+        out = []
+        hops = 0
+        while frontier and (depth is None or hops < depth):
+            hops += 1
+            reached = []
+            for node in frontier:
+                for name in adjacency.get(node, ()):
+                    k = self.key(name)
+                    if k not in seen:
+                        seen.add(k)
+                        out.append((name, hops))
+                        if k != start:
+                            reached.append(k)
+            seen.add(start)  # visited from hop 2 on; hop 1 may list a self-link
+            frontier = reached
+        return out
+
+    def reach(self, app_id, direction="down", depth=1):
+        """neighbors() for depth 1, else the names walk() reaches."""
+        if depth == 1:
+            return self.neighbors(app_id, direction)
+        return [name for name, _ in self.walk(app_id, direction, depth)]
+
+    def edges(self):
+        """(from name, to name) for every distinct link."""
+        for k, targets in self.down.items():
+            source = self.names.get(k)
+            if source:
+                for target in targets:
+                    yield source, target
@@ -1,38 +1,520 @@
-import argparse, json, sys, os, datetime, re
-import pandas as pd
+import argparse, json, sys, os, datetime, re, time, hashlib, contextlib, importlib, copy
 from collections import defaultdict
 import re
 
-# --- NEW: normalization + DB detection helpers ---
-ENV_NORMALIZE = {
-    "prod": "Production",
-    "production": "Production",
-    "prd": "Production",
-    "test": "Test",
-    "tst": "Test",
-    "uat": "UAT",
-    "dev": "Dev",
-    "development": "Dev",
-}
-DB_NAME_PATTERN = re.compile(r'(^|[^a-z])(db|sql|ora)(\d+)?($|[^a-z])', re.IGNORECASE)
+# --- NEW: lazy heavy imports ---
+class _LazyModule:
+    """
+    Placeholder for numpy/pandas: the real module is imported on first
+    attribute access and then replaces the placeholder in this module's
+    globals. --help, argument checks and .txt ID files never import pandas.
+    """
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
 
-def normalize_env(env: str) -> str:
-    if pd.isna(env) or not str(env).strip():
-        return "Unknown"
-    key = str(env).strip().lower()
-    return ENV_NORMALIZE.get(key, str(env).strip().title())
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
 
-def is_db_host(server_name: str) -> bool:
-    if pd.isna(server_name) or not str(server_name).strip():
-        return False
-    return bool(DB_NAME_PATTERN.search(str(server_name)))
+np = _LazyModule("numpy", "np")
+pd = _LazyModule("pandas", "pd")
+
+# --- NEW: normalization + DB detection helpers (shared with summary.py) ---
+from inventory import ENV_NORMALIZE, DB_NAME_PATTERN, normalize_env, is_db_host, InventoryCodes, empty_result  # noqa: F401
+from inventory import normalize_app_id as normalize_id, normalize_app_id_series as normalize_id_series
+from dependency_graph import DependencyGraph
 
 # -------------------------------------------------
 
+# --- NEW: phase timers and counters (--profile) ---
+class _Timer:
+    __slots__ = ("timers", "key", "started")
+
+    def __init__(self, timers, key):
+        self.timers = timers
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        t = self.timers.setdefault(self.key, [0, 0.0])
+        t[0] += 1
+        t[1] += time.perf_counter() - self.started
+        return False
+
+_NO_TIMER = contextlib.nullcontext()
+
+class Profiler:
+    """
+    Per-phase timers and counters for --profile. Keys are (phase, *names),
+    e.g. ("lookup", "B", "All", "ESATS_ID"). While disabled, phase() hands
+    back one shared no-op context and count() returns straight away, so the
+    instrumented code pays a method call and nothing else.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.timers = {}    # key -> [calls, seconds]
+        self.counters = {}  # key -> value
+        self.id_times = []  # (app_id, seconds) per rendered ID
+
+    def phase(self, phase, *names):
+        return _Timer(self.timers, (phase,) + names) if self.enabled else _NO_TIMER
+
+    def count(self, counter, *names, n=1):
+        if self.enabled:
+            key = (counter,) + names
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def drain(self):
+        # Hand this process's numbers to the parent (worker processes)
+        data = (self.timers, self.counters, self.id_times)
+        self.reset()
+        return data
+
+    def merge(self, data):
+        timers, counters, id_times = data
+        for key, (calls, seconds) in timers.items():
+            t = self.timers.setdefault(key, [0, 0.0])
+            t[0] += calls
+            t[1] += seconds
+        for key, n in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + n
+        self.id_times.extend(id_times)
+
+    def report(self, file=None, top=10):
+        print("\nProfile (phase timers):", file=file)
+        rows = sorted(self.timers.items(), key=lambda kv: -kv[1][1])
+        width = max([len(":".join(map(str, k[1:]))) for k, _ in rows] + [4])
+        print(f"  {'phase':<14} {'name':<{width}} {'calls':>8} {'total s':>9} {'mean ms':>9}", file=file)
+        for (phase, *names), (calls, seconds) in rows:
+            name = ":".join(map(str, names))
+            print(f"  {phase:<14} {name:<{width}} {calls:>8} {seconds:>9.3f} {seconds / calls * 1000:>9.3f}", file=file)
+        if self.counters:
+            print("Counters:", file=file)
+            for (counter, *names), n in sorted(self.counters.items(), key=lambda kv: [str(k) for k in kv[0]]):
+                print(f"  {counter:<14} {':'.join(map(str, names)):<{width}} {n:>8}", file=file)
+        if self.id_times:
+            times = sorted(s for _, s in self.id_times)
+            pct = lambda q: times[min(len(times) - 1, int(q * len(times)))] * 1000
+            print(f"Per ID: {len(times)} rendered, p50 {pct(0.5):.2f} ms, p90 {pct(0.9):.2f} ms, max {times[-1] * 1000:.2f} ms", file=file)
+            print(f"Slowest {min(top, len(times))} ID(s):", file=file)
+            for app_id, seconds in sorted(self.id_times, key=lambda x: -x[1])[:top]:
+                print(f"  {app_id}: {seconds * 1000:.2f} ms", file=file)
+
+    def to_json(self):
+        return {
+            "timers": [{"phase": k[0], "name": list(map(str, k[1:])), "calls": c, "seconds": s} for k, (c, s) in self.timers.items()],
+            "counters": [{"counter": k[0], "name": list(map(str, k[1:])), "value": n} for k, n in self.counters.items()],
+            "ids": [{"app_id": str(a), "seconds": s} for a, s in self.id_times],
+        }
+
+PROFILER = Profiler()
+
 def load_sheet(path, sheet_name=None):
-    xls = pd.ExcelFile(path, engine="openpyxl")
-    use_sheet = sheet_name if sheet_name in xls.sheet_names else (sheet_name or xls.sheet_names[0])
-    return pd.read_excel(path, sheet_name=use_sheet, engine="openpyxl")
+    frames, _ = load_workbook_sheets(path, {sheet_name: None})
+    return frames[sheet_name]
+
+def load_workbook_sheets(path, sheets):
+    """
+    Open `path` once and parse every requested sheet from that one handle.
+    sheets: {sheet_name_or_None: set of columns to keep, or None for all}.
+    pandas' openpyxl reader streams rows in read-only mode; usecols drops
+    unreferenced columns before they are materialized.
+    Returns ({sheet_name: DataFrame}, seconds spent parsing).
+    """
+    started = time.perf_counter()
+    frames = {}
+    with pd.ExcelFile(path, engine="openpyxl") as xls:
+        for sheet_name, columns in sheets.items():
+            use_sheet = sheet_name if sheet_name in xls.sheet_names else (sheet_name or xls.sheet_names[0])
+            header = []  # every column name, for error messages
+            usecols = (lambda c, keep=frozenset(columns): header.append(c) or c in keep) if columns else None
+            df = xls.parse(use_sheet, usecols=usecols)
+            df.attrs["header"] = list(dict.fromkeys(header)) if columns else list(df.columns)
+            frames[sheet_name] = df
+    return frames, time.perf_counter() - started
+
+# --- NEW: memory-bounded streaming reader (--low-memory) ---
+# Same frames as load_workbook_sheets(), but rows are streamed from a
+# read-only workbook and only referenced columns are kept, so the full
+# sheet is never materialized. With an ID filter, only rows whose key
+# cells match one of the requested IDs are kept at all.
+_NA_TEXT = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+            "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+def _excel_value(cell):
+    # pandas' openpyxl conversion: blank -> "", error -> NaN, integral numbers -> int
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return float("nan")
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _parses(cast, text):
+    try:
+        cast(text)
+        return True
+    except (TypeError, ValueError, OverflowError):
+        return False
+
+def _value_kind(v):
+    """
+    What pandas' type inference sees in a cell. A column's dtype depends
+    only on which kinds occur in it, so one sample cell per kind stands in
+    for every row the ID filter drops. 0/1 and False/True hash alike in
+    object columns (the first one seen wins), so each is a kind of its own.
+    """
+    if isinstance(v, (bool, int)) and v in (0, 1):
+        return (type(v), v)
+    if isinstance(v, str):
+        return (str, v in _NA_TEXT, v != v.strip(), v.strip().lower() in ("true", "false"),
+                _parses(int, v), _parses(float, v))
+    if isinstance(v, bool):
+        return (bool,)
+    if isinstance(v, int):
+        return (int, v < 0, v >= 2 ** 63, v >= 2 ** 64 or v < -2 ** 63)
+    if isinstance(v, float):
+        return (float, v != v, v in (float("inf"), float("-inf")))
+    return (type(v), getattr(v, "tzinfo", None) is None)
+
+def _id_matcher(ids):
+    # Keep a row when its key cell could fold to a requested ID once the
+    # column is typed (e.g. 1001 read as 1001.0 in a column with blanks).
+    numbers = {float(i) for i in ids if _parses(float, i)}
+
+    def matches(v):
+        if normalize_id(v) in ids:
+            return True
+        if numbers and not isinstance(v, bool) and isinstance(v, (int, float, str)) and _parses(float, v):
+            return float(v) in numbers
+        return False
+    return matches
+
+def stream_workbook_sheets(path, sheets, keys=None, ids=None):
+    """
+    sheets: {sheet_name_or_None: set of columns to keep}.
+    keys: {sheet_name: key columns}; with ids (normalized), a row is kept
+    only when one of its key cells matches a requested ID.
+    Returns ({sheet_name: DataFrame}, seconds spent parsing, {sheet_name: (rows kept, rows read)}).
+    """
+    import openpyxl
+    from pandas.io.parsers import TextParser
+    started = time.perf_counter()
+    frames, counts = {}, {}
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet_name, columns in sheets.items():
+            ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb[sheet_name or wb.sheetnames[0]]
+            ws.reset_dimensions()
+            rows = ws.iter_rows()
+            header_row = [_excel_value(c) for c in next(rows, ())]
+            while header_row and header_row[-1] == "":
+                header_row.pop()
+            header = list(TextParser([header_row], header=0).read().columns) if header_row else []
+            keep = [i for i, name in enumerate(header) if name in columns]
+            key_pos = [i for i in keep if header[i] in (keys or {}).get(sheet_name, ())]
+            matches = _id_matcher(ids) if ids is not None and key_pos else None
+            width = len(header)
+            kept, blanks, read = [], 0, 0
+            samples = [{} for _ in keep]  # per kept column: {kind: value} over every row read
+            for row in rows:
+                filled = [i for i, c in enumerate(row) if c.value is not None and c.value != ""]
+                if not filled:
+                    blanks += 1  # counts only if data follows (read_excel trims trailing blank rows)
+                    continue
+                read += 1
+                width = max(width, filled[-1] + 1)
+                values = [_excel_value(row[i]) if i < len(row) else "" for i in keep]
+                if matches is None:
+                    kept.extend([""] * len(keep) for _ in range(blanks))
+                    kept.append(values)
+                else:
+                    for sample, v in zip(samples, values):
+                        sample.setdefault(_value_kind(v), v)
+                        if blanks:
+                            sample.setdefault(_value_kind(""), "")
+                    if any(matches(v) for i, v in zip(keep, values) if i in key_pos):
+                        kept.append(values)
+                blanks = 0
+            # Rows wider than the header add "Unnamed: n" columns, as in read_excel
+            header += [f"Unnamed: {i}" for i in range(len(header), width)]
+            # One row per value kind seen in each column (in first-seen order), so
+            # the kept rows are typed exactly as in the whole sheet; dropped after parsing.
+            witnesses = []
+            if matches is not None:
+                seen = [list(sample.values()) for sample in samples]
+                for j in range(max(map(len, seen), default=0)):
+                    witnesses.append([values[j % len(values)] for values in seen])
+            df = TextParser([[header[i] for i in keep]] + witnesses + kept, header=0, skip_blank_lines=False).read()
+            if witnesses:
+                df = df.iloc[len(witnesses):].reset_index(drop=True)
+            df.attrs["header"] = header
+            frames[sheet_name] = df
+            counts[sheet_name] = (len(kept), read)
+    finally:
+        wb.close()
+    return frames, time.perf_counter() - started, counts
+
+# --- NEW: on-disk columnar cache of parsed sheets (--cache-dir) ---
+_MIXED_TYPES = {str: 0, int: 1, float: 2, bool: 3}
+_MIXED_DECODE = {0: str, 1: int, 2: float, 3: lambda v: v == "True"}
+
+def file_sha1(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ColumnarCache:
+    """
+    Feather copies of parsed source sheets, one file per (path, sheet, columns).
+    A sidecar JSON records the workbook's size, mtime and SHA-1; an entry is
+    only used while all three still match, otherwise the sheet is re-parsed
+    from Excel and the entry rewritten. Needs pyarrow; without it the cache
+    disables itself and every sheet is parsed from Excel as usual.
+
+    Feather cannot hold object columns that mix str/int/float/bool (common
+    for ID columns typed partly as numbers in Excel), so those are stored as
+    text plus a per-cell type code and rebuilt on read.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._hashes = {}
+        try:
+            import pyarrow.feather  # noqa: F401
+            self.enabled = True
+        except ImportError:
+            print("WARNING: --cache-dir needs pyarrow (pip install pyarrow); parsing Excel directly.", file=sys.stderr)
+            self.enabled = False
+        if self.enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry(self, path, sheet_name, columns):
+        ident = json.dumps([os.path.abspath(path), sheet_name, sorted(columns) if columns else None])
+        base = os.path.join(self.cache_dir, hashlib.sha1(ident.encode("utf-8")).hexdigest())
+        return base + ".feather", base + ".json"
+
+    def _fingerprint(self, path):
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        if key not in self._hashes:
+            self._hashes[key] = file_sha1(path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": self._hashes[key]}
+
+    def load(self, path, sheet_name, columns):
+        if not self.enabled:
+            return None
+        data_path, meta_path = self._entry(path, sheet_name, columns)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            st = os.stat(path)
+            if meta["size"] != st.st_size or meta["mtime_ns"] != st.st_mtime_ns:
+                raise LookupError("stale")
+            if meta["sha1"] != self._fingerprint(path)["sha1"]:
+                raise LookupError("stale")
+            import pyarrow.feather as feather
+            df = feather.read_table(data_path, memory_map=True).to_pandas()
+        except (OSError, ValueError, KeyError, LookupError):
+            self.misses += 1
+            PROFILER.count("disk cache", "miss")
+            return None
+        for col in meta.get("mixed", []):
+            tag = f"__type__{col}"
+            df[col] = pd.Series(
+                [float("nan") if t < 0 else _MIXED_DECODE[t](v) for v, t in zip(df[col], df[tag])],
+                index=df.index, dtype=object,
+            )
+            del df[tag]
+        if "header" in meta:
+            df.attrs["header"] = meta["header"]
+        self.hits += 1
+        PROFILER.count("disk cache", "hit")
+        return df
+
+    def store(self, path, sheet_name, columns, df):
+        if not self.enabled:
+            return
+        if not all(isinstance(c, str) and not c.startswith("__type__") for c in df.columns):
+            return
+        out = df.copy()
+        mixed = []
+        for col in df.columns:
+            if df[col].dtype != object or pd.api.types.infer_dtype(df[col], skipna=True) in ("string", "empty"):
+                continue
+            codes = [-1 if pd.isna(v) else _MIXED_TYPES.get(type(v)) for v in df[col]]
+            if None in codes:
+                return  # e.g. dates mixed with text: not worth caching
+            out[col] = [None if t < 0 else str(v) for v, t in zip(df[col], codes)]
+            out[f"__type__{col}"] = pd.array(codes, dtype="int8")
+            mixed.append(col)
+        import pyarrow.feather as feather
+        data_path, meta_path = self._entry(path, sheet_name, columns)
+        try:
+            feather.write_feather(out.reset_index(drop=True), data_path, compression="uncompressed")
+        except Exception as e:
+            print(f"WARNING: could not cache sheet '{sheet_name}' of {os.path.basename(path)}: {e}", file=sys.stderr)
+            return
+        meta = dict(self._fingerprint(path), path=os.path.abspath(path), sheet=sheet_name, mixed=mixed,
+                    header=[str(c) for c in df.attrs.get("header", df.columns)])
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+# --- NEW: process-wide source registry (shared across all IDs in a run) ---
+class SourceRegistry:
+    """
+    Loads each (alias, path, sheet) once per process and hands the same
+    DataFrame to every extract_fields() call. Keyed on the resolved path so
+    a --source override never reuses a frame loaded from the config path.
+    """
+    def __init__(self):
+        self._frames = {}
+        self._columns = {}
+        self._indexes = {}
+        self.loads = 0        # sheets actually parsed
+        self.saved = 0        # per-call loads that were served from an earlier call
+        self.parse_times = {} # path -> (sheet names, seconds)
+        self.disk_cache = None  # ColumnarCache when --cache-dir is given
+        self.low_memory = False # --low-memory: stream sheets with stream_workbook_sheets()
+        self.only_ids = None    # normalized IDs whose rows are kept when streaming (None = all rows)
+        self.rows_kept = {}     # (path, sheet) -> (rows kept, rows read) when streaming
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    def get_df(self, alias, path, sheet_name=None, wanted=None, keys=None):
+        """
+        wanted: {sheet_name: set(columns)} for this alias (ExecutionPlan.load_columns).
+        On a miss, every wanted sheet of the workbook that is not loaded yet
+        is parsed from the same file handle, keeping only those columns.
+        keys: {sheet_name: key columns} (ExecutionPlan.key_columns), used to
+        drop rows of other IDs when streaming with only_ids.
+        """
+        key = (alias, path, sheet_name)
+        wanted = wanted or {}
+        cols = wanted.get(sheet_name)
+        loaded = self._columns.get(key, set())
+        if key in self._frames and (loaded is None or not cols or cols <= loaded):
+            return self._frames[key]
+
+        to_load = {sheet_name: cols}
+        for other, other_cols in wanted.items():
+            if (alias, path, other) not in self._frames:
+                to_load[other] = other_cols
+        frames = {}
+        streaming = self.low_memory and all(to_load.values())
+        if self.disk_cache is not None and not streaming:
+            for sheet, sheet_cols in to_load.items():
+                with PROFILER.phase("cache read", os.path.basename(path), sheet):
+                    df = self.disk_cache.load(path, sheet, sheet_cols)
+                if df is not None:
+                    frames[sheet] = df
+        parse = {sheet: c for sheet, c in to_load.items() if sheet not in frames}
+        if parse:
+            with PROFILER.phase("parse", os.path.basename(path)):
+                if streaming:
+                    parsed, seconds, counts = stream_workbook_sheets(path, parse, keys, self.only_ids)
+                    self.rows_kept.update(((path, sheet), n) for sheet, n in counts.items())
+                else:
+                    parsed, seconds = load_workbook_sheets(path, parse)
+            sheets, total = self.parse_times.get(path, ([], 0.0))
+            self.parse_times[path] = (sheets + list(parsed), total + seconds)
+            self.loads += len(parsed)
+            if self.disk_cache is not None and not streaming:
+                for sheet, df in parsed.items():
+                    self.disk_cache.store(path, sheet, parse[sheet], df)
+            frames.update(parsed)
+        for sheet, df in frames.items():
+            if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+                df = df.reset_index(drop=True)  # row labels double as positions (InventoryCodes)
+            k = (alias, path, sheet)
+            self._frames[k] = df
+            self._columns[k] = set(to_load[sheet]) if to_load[sheet] else None
+            for ik in [ik for ik in self._indexes if ik[:3] == k]:
+                del self._indexes[ik]
+        return self._frames[key]
+
+    def get_index(self, alias, path, sheet_name, column):
+        """
+        Normalized key -> row positions for `column`, built once per sheet.
+        Keys are folded exactly like the old per-call scan
+        (astype(str).strip().upper()), so lookups return the same rows.
+        """
+        key = (alias, path, sheet_name, column)
+        idx = self._indexes.get(key)
+        if idx is None:
+            df = self.get_df(alias, path, sheet_name)
+            with PROFILER.phase("index", alias, sheet_name, column):
+                keys = normalize_id_series(df[column])
+                idx = keys.groupby(keys.values, sort=False).indices
+            self._indexes[key] = idx
+        return idx
+
+    def get_inventory_codes(self, alias, path, sheet_name, columns):
+        """InventoryCodes for these (env, server, OS name, OS version) columns, built once per sheet."""
+        key = (alias, path, sheet_name, ("inventory",) + tuple(columns))  # invalidated with the indexes
+        codes = self._indexes.get(key)
+        if codes is None:
+            df = self.get_df(alias, path, sheet_name)
+            with PROFILER.phase("intern", alias, sheet_name):
+                codes = InventoryCodes.from_frame(df, columns)
+            self._indexes[key] = codes
+        return codes
+
+    def get_dependency_graph(self, alias, path, sheet_name, from_column, to_column):
+        """DependencyGraph over from_column -> to_column, built once per sheet."""
+        key = (alias, path, sheet_name, ("graph", from_column, to_column))  # invalidated with the indexes
+        graph = self._indexes.get(key)
+        if graph is None:
+            df = self.get_df(alias, path, sheet_name)
+            with PROFILER.phase("graph", alias, sheet_name):
+                graph = DependencyGraph.from_frame(df, from_column, to_column)
+            self._indexes[key] = graph
+        return graph
+
+    def copy(self, drop_paths=()):
+        """A new registry sharing every loaded frame and index except those read from drop_paths."""
+        other = SourceRegistry()
+        other.disk_cache = self.disk_cache
+        other.low_memory, other.only_ids = self.low_memory, self.only_ids
+        other._frames = {k: v for k, v in self._frames.items() if k[1] not in drop_paths}
+        other._columns = {k: v for k, v in self._columns.items() if k[1] not in drop_paths}
+        other._indexes = {k: v for k, v in self._indexes.items() if k[1] not in drop_paths}
+        return other
+
+    def clear(self):
+        self._frames.clear()
+        self._columns.clear()
+        self._indexes.clear()
+        self.loads = 0
+        self.saved = 0
+        self.parse_times.clear()
+        self.rows_kept.clear()
+
+    def report(self, file=None):
+        for path, (sheets, seconds) in self.parse_times.items():
+            print(f"Parsed {os.path.basename(path)} ({', '.join(str(s) for s in sheets)}) in {seconds:.2f}s", file=file)
+        for (path, sheet), (kept, read) in self.rows_kept.items():
+            print(f"Streamed {os.path.basename(path)} ({sheet}): kept {kept} of {read} row(s)", file=file)
+        print(f"Source cache: {self.loads} sheet load(s), {self.saved} load(s) saved.", file=file)
+        if self.disk_cache is not None and self.disk_cache.enabled:
+            print(f"Disk cache: {self.disk_cache.hits} hit(s), {self.disk_cache.misses} miss(es).", file=file)
+
+SOURCE_REGISTRY = SourceRegistry()
 
 def transform_value(val, transform=None, split=None, join=None):
     if pd.isna(val):
@@ -77,423 +559,1361 @@ def sanitize_filename(name: str) -> str:
     # Replace invalid filename chars with underscore
     return re.sub(r'[\\/:*?"<>|]+', "_", name).strip()
 
-def extract_fields(cfg, app_id, source_overrides):
+# ------------------------
+# Field aggregators: matched rows -> structured value.
+# format_field() turns a value into Markdown lines.
+# ------------------------
+NOT_FOUND = "_(not found)_"
+
+def _cells(series):
+    # (values, is-NA flags) as plain arrays: no per-row Series objects
+    vals = series.to_numpy(dtype=object)
+    return vals, pd.isna(vals)
+
+def _text(series):
+    # Column-wise version of: "" if pd.isna(v) else str(v).strip()
+    vals, na = _cells(series)
+    return ["" if n else str(v).strip() for v, n in zip(vals, na)]
+
+def _env_names(series):
+    # normalize_env once per distinct value instead of once per row.
+    # Memoized on the text, not the raw cell: 3 == 3.0 == True would collapse.
+    vals, na = _cells(series)
+    memo = {}
+    out = []
+    for v, n in zip(vals, na):
+        if n:
+            out.append("Unknown")
+            continue
+        t = str(v)
+        if t not in memo:
+            memo[t] = normalize_env(t)
+        out.append(memo[t])
+    return out
+
+def _unique_join_parts(series, fld):
+    # transform_value + optional split per cell -> list of parts per row
+    # ("" parts are left for stable_unique to drop)
+    vals, na = _cells(series)
+    transform = fld.get("transform")
+    split = fld.get("split")
+    out = []
+    for v, n in zip(vals, na):
+        if n:
+            out.append([])
+            continue
+        v = transform_value(v, transform=transform)
+        if v and split:
+            out.append([p.strip() for p in v.split(split)])
+        else:
+            out.append([v.strip()] if v else [])
+    return out
+
+def aggregate_simple(fld, rows, alias):
+    # Default: simple single-column on first match
+    if len(rows) == 0:
+        return ""
+    col = fld["column"]
+    if col not in rows.columns:
+        raise ValueError(f"Column '{col}' missing for label '{fld['label']}' in source {alias}. Available: {list(rows.columns)}")
+    raw = rows[col].iloc[0]
+    return transform_value(raw, transform=fld.get("transform"), split=fld.get("split"), join=fld.get("join"))
+
+def aggregate_unique_join(fld, rows, alias):
+    col = fld["column"]
+    if len(rows) == 0:
+        return []
+    if col not in rows.columns:
+        raise ValueError(f"Column '{col}' missing for label '{fld['label']}' in source {alias}. Available: {list(rows.columns)}")
+    return stable_unique(p for parts in _unique_join_parts(rows[col], fld) for p in parts)
+
+def aggregate_group_by(fld, rows, alias):
+    key_col = fld["group_by_column"]
+    val_col = fld["value_column"]
+    if len(rows) == 0:
+        return {}
+    for c in [key_col, val_col]:
+        if c not in rows.columns:
+            raise ValueError(f"Column '{c}' missing for label '{fld['label']}' in source {alias}. Available: {list(rows.columns)}")
+
+    grouped = {}
+    for k, v in zip(_text(rows[key_col]), _text(rows[val_col])):
+        if k == "" or v == "":
+            continue
+        grouped.setdefault(k, []).append(v)
+    if fld.get("unique", True):
+        grouped = {k: stable_unique(vals) for k, vals in grouped.items()}
+    return grouped
+
+def aggregate_dependencies(fld, rows, alias):
+    # rows: matches on match_column (not the ID column)
+    vals, na = _cells(rows[fld["return_column"]])
+    return stable_unique(str(v).strip() for v, n in zip(vals, na) if not n)
+
+def _inventory_columns(fld):
+    return (
+        fld.get("env_column", "ENVIRONMENT"),
+        fld.get("server_column", "SERVER"),
+        fld.get("os_name_column", "OS_NAME"),
+        fld.get("os_version_column", "OS_VERSION"),
+    )
+
+def aggregate_inventory_summary(fld, rows, alias, codes=None):
+    """
+    codes: the sheet's InventoryCodes when rows come from a registry frame
+    (row labels are positions in it); otherwise rows are interned here.
+    """
+    columns = _inventory_columns(fld)
+    if len(rows) == 0:
+        return empty_result()
+    if codes is not None:
+        return codes.summarize(rows.index.to_numpy())
+    for c in columns:
+        if c not in rows.columns:
+            raise ValueError(f"Column '{c}' missing for inventory_summary in source {alias}. Available: {list(rows.columns)}")
+    return InventoryCodes.from_frame(rows, columns).summarize(np.arange(len(rows)))
+
+def _cell_text(series):
+    # Markdown table cell: "" for NA, single line, stripped
+    vals, na = _cells(series)
+    return ["" if n else str(v).replace("\r", " ").replace("\n", " ").strip() for v, n in zip(vals, na)]
+
+def aggregate_inventory_table(fld, rows, alias):
+    label = fld["label"]
+    cols = fld.get("columns")
+    if not cols:
+        raise ValueError(f"'inventory_table' for '{label}' requires a 'columns' array in config.")
+    headers_map = fld.get("headers", {})
+    sort_by = fld.get("sort_by", ["ENVIRONMENT", "SERVER"])
+    env_col = fld.get("env_column", "ENVIRONMENT")
+    headers = [headers_map.get(c, c.title() if c.isupper() else c) for c in cols]
+    if len(rows) == 0:
+        return {"headers": headers, "rows": []}
+
+    for c in cols:
+        if c not in rows.columns:
+            raise ValueError(f"Column '{c}' missing for inventory_table in source {alias}. Available: {list(rows.columns)}")
+
+    df = rows.copy()
+    if env_col in df.columns:
+        df[env_col] = _env_names(df[env_col])
+
+    df = df.dropna(how="all", subset=cols)
+
+    sort_by = [c for c in sort_by if c in df.columns]
+    if sort_by:
+        df = df.sort_values(by=sort_by, kind="stable")
+
+    cells = [_cell_text(df[c]) for c in cols]
+    return {"headers": headers, "rows": [list(r) for r in zip(*cells)]}
+
+AGGREGATORS = {
+    "unique_join": aggregate_unique_join,
+    "group_by": aggregate_group_by,
+    "dependencies": aggregate_dependencies,
+    "inventory_summary": aggregate_inventory_summary,
+    "inventory_table": aggregate_inventory_table,
+}
+
+def to_md_table(headers, rows):
+    lines_tbl = [
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join("---" for _ in headers) + " |"
+    ]
+    for cells in rows:
+        lines_tbl.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines_tbl)
+
+def format_field(fld, value):
+    """
+    Markdown for one field's value. Returns (lines, rendered) where
+    `rendered` is the inline text used to pick up the app name.
+    """
+    label = fld["label"]
+    aggregate = fld.get("aggregate")
+    joiner = fld.get("join", ", ")
+
+    if aggregate == "inventory_summary":
+        servers_by_env = value["Servers by Environment"]
+        lines = [f"**Environment(s):** {', '.join(value['Environments']) if value['Environments'] else NOT_FOUND}"]
+        lines.append("**Servers by Environment:**")
+        if servers_by_env:
+            for e, svrs in servers_by_env.items():
+                lines.append(f"- {e}: {', '.join(svrs)}")
+        else:
+            lines.append(f"- {NOT_FOUND}")
+        lines.append(f"**Operating System:** {', '.join(value['Operating System']) if value['Operating System'] else NOT_FOUND}")
+        lines.append(f"**OS Version:** {', '.join(value['OS Version']) if value['OS Version'] else NOT_FOUND}")
+        if fld.get("show_db_hosts"):
+            lines.append("**Database Servers by Environment:**")
+            db_by_env = value["Database Servers by Environment"]
+            if db_by_env:
+                for e, hosts in db_by_env.items():
+                    lines.append(f"- {e}: {', '.join(hosts)}")
+            else:
+                lines.append(f"- {NOT_FOUND}")
+        return lines, ""
+
+    if aggregate == "inventory_table":
+        return [f"**{label}:**", to_md_table(value["headers"], value["rows"]), ""], ""
+
+    if aggregate == "group_by":
+        keys = fld.get("key_order") or list(value.keys())
+        if fld.get("style", "inline") == "bulleted":
+            segs = [f"**{label}:**"]
+            segs.extend(f"- {k}: {joiner.join(value[k])}" for k in keys if value.get(k))
+            rendered = "\n".join(segs)
+            return [rendered], rendered
+        parts = [f"{k}: {joiner.join(value[k])}" for k in keys if value.get(k)]
+        if parts:
+            rendered = f"**{label}:** " + "; ".join(parts)
+            return [rendered], rendered
+        rendered = ""
+    elif aggregate in ("unique_join", "dependencies"):
+        rendered = joiner.join(value)
+    else:
+        rendered = value
+    return [f"**{label}:** {rendered if rendered else NOT_FOUND}"], rendered
+
+# ------------------------
+# NEW: compiled execution plan
+# The JSON config is resolved once: source paths (with --source overrides,
+# without touching cfg), the (source, sheet, key column) lookups an app
+# needs, the columns every sheet must provide, and a bound aggregator per
+# field. Config mistakes are raised here, before any workbook is parsed.
+# ------------------------
+_REQUIRED_KEYS = {
+    None: ["column"],
+    "unique_join": ["column"],
+    "group_by": ["group_by_column", "value_column"],
+    "dependencies": ["match_column", "return_column"],
+    "inventory_summary": [],
+    "inventory_table": [],
+}
+
+class FieldStep:
+    """One configured field: where its rows come from and how to aggregate them."""
+    def __init__(self, pos, fld, alias, sheet, lookup):
+        self.pos = pos
+        self.fld = fld
+        self.label = fld["label"]
+        self.alias = alias
+        self.sheet = sheet
+        self.lookup = lookup  # (alias, sheet, key column) -- shared by fields with the same key
+        self.aggregate = fld.get("aggregate")
+        self.emit_key = fld.get("emit_file", "main") or "main"
+        self.aggregator = AGGREGATORS.get(self.aggregate, aggregate_simple)
+        depth = fld.get("depth", 1)
+        self.depth = None if depth == "all" else depth  # dependencies: hops to follow (None = all)
+
+    def render(self, rows, codes=None):
+        if codes is not None:
+            return self.aggregator(self.fld, rows, self.alias, codes=codes)
+        return self.aggregator(self.fld, rows, self.alias)
+
+class ExecutionPlan:
+    def __init__(self, cfg, sources, steps, load_columns, required_columns, only_files=None):
+        self.cfg = cfg
+        self.only_files = only_files              # None, or the output keys to write (--only-files)
+        self.sources = sources                    # alias -> resolved source dict
+        self.steps = steps                        # [FieldStep] in config order
+        self.load_columns = load_columns          # alias -> {sheet: set(columns)} to read
+        self.required_columns = required_columns  # (alias, sheet) -> {column: label needing it}
+        self.lookups = list(dict.fromkeys(step.lookup for step in steps))
+        self.key_columns = {}  # alias -> {sheet: lookup key columns}; plain dicts so the plan pickles (spawn workers)
+        for alias, sheet, col in self.lookups:
+            self.key_columns.setdefault(alias, {}).setdefault(sheet, set()).add(col)
+        # dependencies fields over the same column pair share one graph, oriented
+        # like the first of them; multi-hop fields need every row of their sheet
+        self.graph_columns = {}  # (alias, sheet, {match, return}) -> (from column, to column)
+        for step in steps:
+            if step.aggregate == "dependencies":
+                pair = (step.fld["match_column"], step.fld["return_column"])
+                self.graph_columns.setdefault((step.alias, step.sheet, frozenset(pair)), pair)
+                if step.depth != 1:
+                    self.key_columns.get(step.alias, {}).pop(step.sheet, None)
+
+    def sheet_keys(self):
+        return [(alias, self.sources[alias]["path"], sheet) for alias, sheets in self.load_columns.items() for sheet in sheets]
+
+    def get_df(self, registry, alias, sheet):
+        return registry.get_df(alias, self.sources[alias]["path"], sheet, wanted=self.load_columns[alias],
+                               keys=self.key_columns.get(alias))
+
+    def load(self, registry):
+        """
+        Parse every referenced sheet not yet resident in `registry`, check
+        the columns the fields need once, and build the lookup indexes.
+        """
+        for alias, path, sheet in self.sheet_keys():
+            fresh = (alias, path, sheet) not in registry
+            df = self.get_df(registry, alias, sheet)
+            if fresh:
+                for col, label in self.required_columns.get((alias, sheet), {}).items():
+                    if col not in df.columns:
+                        available = df.attrs.get("header", list(df.columns))
+                        raise ValueError(f"Column '{col}' missing for label '{label}' in source {alias}. Available: {available}")
+        for alias, sheet, col in self.lookups:
+            registry.get_index(alias, self.sources[alias]["path"], sheet, col)
+        for step in self.steps:
+            self.inventory_codes(registry, step)
+            self.dependency_graph(registry, step)
+
+    def inventory_codes(self, registry, step):
+        # Interned columns for inventory_summary fields (None for every other aggregate)
+        if step.aggregate != "inventory_summary":
+            return None
+        return registry.get_inventory_codes(step.alias, self.sources[step.alias]["path"], step.sheet, _inventory_columns(step.fld))
+
+    def dependency_graph(self, registry, step):
+        # Shared DependencyGraph for dependencies fields (None for every other aggregate)
+        if step.aggregate != "dependencies":
+            return None
+        pair = (step.fld["match_column"], step.fld["return_column"])
+        from_column, to_column = self.graph_columns[(step.alias, step.sheet, frozenset(pair))]
+        return registry.get_dependency_graph(step.alias, self.sources[step.alias]["path"], step.sheet, from_column, to_column)
+
+    def dependencies(self, registry, step, app_id):
+        """A dependencies field's value for one app, from the graph: O(degree) per hop."""
+        graph = self.dependency_graph(registry, step)
+        direction = "down" if graph.from_column == step.fld["match_column"] else "up"
+        return graph.reach(app_id, direction, step.depth)
+
+    def render_step(self, registry, step, rows):
+        return step.render(rows, self.inventory_codes(registry, step))
+
+    def find_rows(self, registry, lookup, app_id):
+        # Get ALL matching rows for an app_id (O(1) via the registry's index)
+        alias, sheet, col = lookup
+        df = self.get_df(registry, alias, sheet)
+        index = registry.get_index(alias, self.sources[alias]["path"], sheet, col)
+        with PROFILER.phase("lookup", alias, sheet, col):
+            positions = index.get(normalize_id(app_id), [])
+            PROFILER.count("rows matched", alias, sheet, col, n=len(positions))
+            return df.iloc[positions]  # DataFrame (possibly empty)
+
+def compile_plan(cfg, source_overrides=None, only_files=None):
+    """
+    only_files: output keys to produce ("main" and/or extra_files keys).
+    Fields feeding other files are dropped, so their sources are never
+    loaded; the app-name field is always kept since it names the files.
+    """
     sources_cfg = cfg.get("sources", {})
     if not sources_cfg:
         raise ValueError("Config 'sources' is empty. Define at least one source with path/id default.")
 
-    # Apply CLI overrides
-    for alias, override_path in source_overrides.items():
-        if alias not in sources_cfg:
+    # Apply CLI overrides (on copies, so cfg can be reused)
+    sources = {alias: dict(src) for alias, src in sources_cfg.items()}
+    for alias, override_path in (source_overrides or {}).items():
+        if alias not in sources:
             raise ValueError(f"Override provided for unknown source alias '{alias}'. Add it to config 'sources'.")
-        sources_cfg[alias]["path"] = override_path
-
-    # Cache DataFrames per (alias, sheet_name)
-    cache = {}
-    def get_df(alias, sheet_name=None):
-        src = sources_cfg.get(alias)
+        sources[alias]["path"] = override_path
+
+    if only_files is not None:
+        only_files = set(only_files)
+        unknown = only_files - {"main"} - set(cfg.get("extra_files", {}))
+        if unknown:
+            raise ValueError(f"Unknown output file(s) {sorted(unknown)}. Choose from: {['main'] + list(cfg.get('extra_files', {}))}")
+    app_label = cfg.get("app_name_field_label", "Application Name")
+
+    steps = []
+    load_columns = defaultdict(lambda: defaultdict(set))
+    required = defaultdict(dict)
+    for pos, fld in enumerate(cfg.get("fields", [])):
+        label = fld.get("label")
+        if not label:
+            raise ValueError(f"Field #{pos + 1} has no 'label'.")
+        if only_files is not None and (fld.get("emit_file", "main") or "main") not in only_files and label != app_label:
+            continue
+        alias = fld.get("source")
+        src = sources.get(alias)
         if not src:
             raise ValueError(f"Unknown source alias '{alias}' in fields.")
         path = src.get("path")
         if not path or not os.path.exists(path):
             raise ValueError(f"Source '{alias}' path not found: {path}")
-        default_sheet = src.get("sheet_name_default")
-        key = (alias, sheet_name or default_sheet)
-        if key in cache:
-            return cache[key]
-        df = load_sheet(path, key[1])
-        cache[key] = df
-        return df
 
-    # Get ALL matching rows for an app_id
-    def find_rows(alias, sheet_name, id_column, app_id):
-        src = sources_cfg[alias]
-        the_id_col = id_column or src.get("id_column_default") or "ApplicationID"
-        df = get_df(alias, sheet_name or src.get("sheet_name_default"))
-        if the_id_col not in df.columns:
-            raise ValueError(f"ID column '{the_id_col}' not in source {alias}. Available: {list(df.columns)}")
-        matches = df[df[the_id_col].astype(str).str.strip().str.upper() == str(app_id).strip().upper()]
-        return matches  # DataFrame (possibly empty)
-
-    # --- NEW: support multiple output files ---
-    outputs = defaultdict(list)  # key -> list of lines
-    def out_lines(key):          # get writer (defaults to "main")
-        return outputs[key or "main"]
+        aggregate = fld.get("aggregate")
+        for key in _REQUIRED_KEYS.get(aggregate, _REQUIRED_KEYS[None]):
+            if not fld.get(key):
+                raise ValueError(f"Field '{label}' ({aggregate or 'single value'}) needs '{key}' in config.")
+        if aggregate == "inventory_table" and not fld.get("columns"):
+            raise ValueError(f"'inventory_table' for '{label}' requires a 'columns' array in config.")
+        depth = fld.get("depth", 1)
+        if aggregate == "dependencies" and depth != "all" and (type(depth) is not int or depth < 1):
+            raise ValueError(f"'depth' for '{label}' must be a whole number >= 1 or \"all\".")
+
+        sheet = fld.get("sheet_name") or src.get("sheet_name_default")
+        id_col = fld.get("id_column") or src.get("id_column_default") or "ApplicationID"
+        if aggregate == "dependencies":
+            needs = [fld["match_column"], fld["return_column"]]
+            lookup = (alias, sheet, fld["match_column"])
+        else:
+            if aggregate == "group_by":
+                needs = [fld["group_by_column"], fld["value_column"]]
+            elif aggregate == "inventory_summary":
+                needs = list(_inventory_columns(fld))
+            elif aggregate == "inventory_table":
+                needs = list(fld["columns"])
+            else:
+                needs = [fld["column"]]
+            needs = [id_col] + needs
+            lookup = (alias, sheet, id_col)
+
+        cols = load_columns[alias][sheet]
+        cols.update(needs)
+        if aggregate == "inventory_table":
+            # optional: used only when present in the sheet
+            cols.update(fld.get("sort_by", ["ENVIRONMENT", "SERVER"]))
+            cols.add(fld.get("env_column", "ENVIRONMENT"))
+        for c in needs:
+            required[(alias, sheet)].setdefault(c, label)
+        steps.append(FieldStep(pos, fld, alias, sheet, lookup))
+
+    load_columns = {alias: dict(sheets) for alias, sheets in load_columns.items()}
+    return ExecutionPlan(cfg, sources, steps, load_columns, dict(required), only_files)
 
-    app_name = None
+# ------------------------
+# NEW: vectorized batch engine
+# Gathers every requested ID's rows per (source, sheet, key column) in one
+# pass and computes each field's value for all IDs with column operations.
+# extract_fields() then only formats the precomputed values.
+# ------------------------
+def _gather(index, ids):
+    # (normalized key per matched row, row positions), rows grouped by key in source order
+    present = [k for k in ids if k in index]
+    if not present:
+        return np.array([], dtype=object), np.array([], dtype=np.intp)
+    lens = [len(index[k]) for k in present]
+    return np.repeat(np.array(present, dtype=object), lens), np.concatenate([index[k] for k in present])
+
+def _lists_by_key(keys, values):
+    frame = pd.DataFrame({"k": keys, "v": values})
+    frame = frame[frame["v"] != ""].drop_duplicates()
+    return frame.groupby("k", sort=False)["v"].agg(list).to_dict()
+
+def batch_simple(fld, df, index, ids):
+    col = df[fld["column"]]
+    present = [k for k in ids if k in index]
+    firsts = col.take([index[k][0] for k in present])
+    return {
+        k: transform_value(v, transform=fld.get("transform"), split=fld.get("split"), join=fld.get("join"))
+        for k, v in zip(present, firsts)
+    }
+
+def batch_unique_join(fld, df, index, ids):
+    keys, pos = _gather(index, ids)
+    parts = _unique_join_parts(df[fld["column"]].take(pos), fld)
+    return _lists_by_key(np.repeat(keys, [len(p) for p in parts]), [p for ps in parts for p in ps])
+
+def batch_group_by(fld, df, index, ids):
+    keys, pos = _gather(index, ids)
+    frame = pd.DataFrame({
+        "id": keys,
+        "k": _text(df[fld["group_by_column"]].take(pos)),
+        "v": _text(df[fld["value_column"]].take(pos)),
+    })
+    frame = frame[(frame["k"] != "") & (frame["v"] != "")]
+    if fld.get("unique", True):
+        frame = frame.drop_duplicates()
+    out = {}
+    for (app, k), vals in frame.groupby(["id", "k"], sort=False)["v"]:
+        out.setdefault(app, {})[k] = list(vals)
+    return out
 
-    for fld in cfg.get("fields", []):
-        label = fld["label"]
-        alias = fld["source"]
-        sheet_name = fld.get("sheet_name")
-        id_column = fld.get("id_column")
-        aggregate = fld.get("aggregate")
-        joiner = fld.get("join", ", ")
-        emit_key = fld.get("emit_file", "main")  # <-- NEW: which file to write to
-
-        rows = find_rows(alias, sheet_name, id_column, app_id)
-        lines = out_lines(emit_key)  # writer for this field
-
-        # Default: simple single-column on first match
-        def render_simple():
-            if len(rows) == 0:
-                return ""
-            col = fld["column"]
-            if col not in rows.columns:
-                raise ValueError(f"Column '{col}' missing for label '{label}' in source {alias}. Available: {list(rows.columns)}")
-            raw = rows.iloc[0][col]
-            return transform_value(raw, transform=fld.get("transform"), split=fld.get("split"), join=fld.get("join"))
+def batch_inventory_summary(fld, df, index, ids, codes=None):
+    codes = codes if codes is not None else InventoryCodes.from_frame(df, _inventory_columns(fld))
+    return codes.summarize_groups({k: index[k] for k in ids if k in index})
 
-        rendered = ""
+BATCH_AGGREGATORS = {
+    None: batch_simple,
+    "unique_join": batch_unique_join,
+    "group_by": batch_group_by,
+    "inventory_summary": batch_inventory_summary,
+}
 
-        if aggregate == "unique_join":
-            col = fld["column"]
-            if len(rows) > 0 and col not in rows.columns:
-                raise ValueError(f"Column '{col}' missing for label '{label}' in source {alias}. Available: {list(rows.columns)}")
-            values = []
-            for _, r in rows.iterrows():
-                v = r[col] if col in r.index else ""
-                v = transform_value(v, transform=fld.get("transform"))
-                if v and fld.get("split"):
-                    parts = [p.strip() for p in v.split(fld["split"]) if p is not None]
-                    values.extend(parts)
-                elif v:
-                    values.append(str(v).strip())
-            values = stable_unique(values)
-            rendered = joiner.join(values)
-
-        elif aggregate == "group_by":
-            key_col = fld["group_by_column"]
-            val_col = fld["value_column"]
-            style = fld.get("style", "inline")
-            want_unique = fld.get("unique", True)
-
-            for c in [key_col, val_col]:
-                if len(rows) > 0 and c not in rows.columns:
-                    raise ValueError(f"Column '{c}' missing for label '{label}' in source {alias}. Available: {list(rows.columns)}")
-
-            grouped = {}
-            for _, r in rows.iterrows():
-                k = r[key_col] if key_col in r.index else ""
-                v = r[val_col] if val_col in r.index else ""
-                k = "" if pd.isna(k) else str(k).strip()
-                v = "" if pd.isna(v) else str(v).strip()
-                if k == "" or v == "":
-                    continue
-                grouped.setdefault(k, []).append(v)
-
-            key_order = fld.get("key_order")
-            keys = key_order if key_order else list(grouped.keys())
-
-            if style == "bulleted":
-                segs = [f"**{label}:**"]
-                for k in keys:
-                    vals = grouped.get(k, [])
-                    if want_unique:
-                        vals = stable_unique(vals)
-                    if not vals:
-                        continue
-                    segs.append(f"- {k}: {joiner.join(vals)}")
-                rendered = "\n".join(segs)
-            else:
-                parts = []
-                for k in keys:
-                    vals = grouped.get(k, [])
-                    if want_unique:
-                        vals = stable_unique(vals)
-                    if not vals:
-                        continue
-                    parts.append(f"{k}: {joiner.join(vals)}")
-                rendered = f"**{label}:** " + "; ".join(parts) if parts else ""
-
-        elif aggregate == "dependencies":
-            match_col = fld["match_column"]
-            ret_col = fld["return_column"]
-            src = cfg["sources"][alias]
-            df = load_sheet(src["path"], src.get("sheet_name_default"))
-            if match_col not in df.columns or ret_col not in df.columns:
-                raise ValueError(f"Dependency columns '{match_col}'/'{ret_col}' not found in source {alias}. Available: {list(df.columns)}")
-            mm = df[df[match_col].astype(str).str.strip().str.upper() == str(app_id).strip().upper()]
-            values = []
-            for _, r in mm.iterrows():
-                v = r[ret_col]
-                if pd.isna(v):
-                    continue
-                values.append(str(v).strip())
-            values = stable_unique(values)
-            rendered = joiner.join(values)
-
-        #---- inventory summary table ----
-        elif aggregate == "inventory_summary":
-            env_col = fld.get("env_column", "ENVIRONMENT")
-            server_col = fld.get("server_column", "SERVER")
-            os_name_col = fld.get("os_name_column", "OS_NAME")
-            os_ver_col = fld.get("os_version_column", "OS_VERSION")
-
-            for c in [env_col, server_col, os_name_col, os_ver_col]:
-                if len(rows) > 0 and c not in rows.columns:
-                    raise ValueError(f"Column '{c}' missing for inventory_summary in source {alias}. Available: {list(rows.columns)}")
-
-            envs = set()
-            servers_by_env = defaultdict(set)
-            os_names = set()
-            os_versions = set()
-            db_by_env = defaultdict(set)
-
-            for _, r in rows.iterrows():
-                env = normalize_env(r.get(env_col, ""))
-                server = "" if pd.isna(r.get(server_col)) else str(r.get(server_col)).strip()
-                osn = "" if pd.isna(r.get(os_name_col)) else str(r.get(os_name_col)).strip()
-                osv = "" if pd.isna(r.get(os_ver_col)) else str(r.get(os_ver_col)).strip()
-
-                if env != "Unknown":
-                    envs.add(env)
-                if server:
-                    servers_by_env[env].add(server)
-                    if is_db_host(server):
-                        db_by_env[env].add(server)
-                if osn:
-                    os_names.add(osn)
-                if osv:
-                    os_versions.add(osv)
-
-            lines.append(f"**Environment(s):** {', '.join(sorted(envs)) if envs else '_(not found)_'}")
-
-            lines.append("**Servers by Environment:**")
-            if servers_by_env:
-                for e, svrs in sorted(servers_by_env.items()):
-                    if svrs:
-                        lines.append(f"- {e}: {', '.join(sorted(svrs))}")
+def precompute_fields(plan, app_ids, registry=None):
+    """
+    Values for every (field, app ID) the batch engine can handle:
+    {field position: {normalized app ID: value}}. inventory_table fields
+    are left to extract_fields; dependencies fields are read from the
+    plan's dependency graph, which is already built once for all apps.
+    """
+    registry = registry if registry is not None else SOURCE_REGISTRY
+    plan.load(registry)
+    ids = list(dict.fromkeys(normalize_id(a) for a in app_ids))
+    results = {}
+    for step in plan.steps:
+        batch_fn = BATCH_AGGREGATORS.get(step.aggregate if step.aggregate in AGGREGATORS else None)
+        if batch_fn is None:
+            continue
+        df = plan.get_df(registry, step.alias, step.sheet)
+        index = registry.get_index(step.alias, plan.sources[step.alias]["path"], *step.lookup[1:])
+        with PROFILER.phase("batch engine", step.label):
+            codes = plan.inventory_codes(registry, step)
+            values = batch_fn(step.fld, df, index, ids) if codes is None else batch_fn(step.fld, df, index, ids, codes=codes)
+        empty = step.render(df.iloc[0:0])
+        results[step.pos] = {k: values.get(k, empty) for k in ids}
+    return results
+
+def render_app(plan, app_id, registry=None, precomputed=None, formatted=True):
+    """
+    (app_name, sections) for one app. sections lazily yields
+    (step, lines, rendered) in config order, so callers can stream each
+    section out as soon as it is rendered; with formatted=False it yields
+    (step, value) with the aggregate's structured value instead. The
+    app-name field is rendered up front: the name picks the run folder,
+    file names and titles.
+    """
+    registry = registry if registry is not None else SOURCE_REGISTRY
+    precomputed = precomputed or {}
+    plan.load(registry)
+
+    app_label = plan.cfg.get("app_name_field_label", "Application Name")
+    norm_id = normalize_id(app_id)
+    fetched = {}  # lookup -> rows, shared by fields with the same (source, sheet, key column)
+
+    def compute(step):
+        if norm_id in precomputed.get(step.pos, ()):
+            PROFILER.count("precomputed", step.label)
+            return precomputed[step.pos][norm_id]
+        if step.aggregate == "dependencies":
+            with PROFILER.phase("lookup", step.alias, step.sheet, "graph"):
+                return plan.dependencies(registry, step, app_id)
+        if step.lookup not in fetched:
+            fetched[step.lookup] = plan.find_rows(registry, step.lookup, app_id)
+        with PROFILER.phase("aggregate", step.label):
+            return plan.render_step(registry, step, fetched[step.lookup])
+
+    def render(step, value):
+        with PROFILER.phase("format", step.aggregate or "simple"):
+            return format_field(step.fld, value)  # (lines, rendered)
+
+    computed_early = {}
+    app_name = None
+    for step in plan.steps:
+        if step.label == app_label:
+            computed_early[step.pos] = compute(step)
+            rendered = render(step, computed_early[step.pos])[1]
+            if rendered:
+                app_name = rendered
+
+    def sections():
+        for step in plan.steps:
+            value = computed_early.pop(step.pos) if step.pos in computed_early else compute(step)
+            if formatted:
+                yield (step,) + render(step, value)
             else:
-                lines.append("- _(not found)_")
-
-            lines.append(f"**Operating System:** {', '.join(sorted(os_names)) if os_names else '_(not found)_'}")
-            lines.append(f"**OS Version:** {', '.join(sorted(os_versions)) if os_versions else '_(not found)_'}")
-
-            rendered = ""  # we've already appended to output
-
-        # --- NEW: inventory_table (Markdown table) ---
-        elif aggregate == "inventory_table":
-            cols = fld.get("columns")
-            if not cols:
-                raise ValueError(f"'inventory_table' for '{label}' requires a 'columns' array in config.")
-            headers_map = fld.get("headers", {})
-            sort_by = fld.get("sort_by", ["ENVIRONMENT", "SERVER"])
-            env_col = fld.get("env_column", "ENVIRONMENT")
-
-            for c in cols:
-                if len(rows) > 0 and c not in rows.columns:
-                    raise ValueError(f"Column '{c}' missing for inventory_table in source {alias}. Available: {list(rows.columns)}")
-
-            df = rows.copy()
-            if env_col in df.columns:
-                df[env_col] = df[env_col].apply(normalize_env)
-
-            df = df.dropna(how="all", subset=cols)
-
-            sort_by = [c for c in sort_by if c in df.columns]
-            if sort_by:
-                df = df.sort_values(by=sort_by, kind="stable")
-
-            out_df = df[cols].copy()
-            final_headers = [headers_map.get(c, c.title() if c.isupper() else c) for c in cols]
-
-            def to_md_table(df, headers):
-                lines_tbl = [
-                    "| " + " | ".join(headers) + " |",
-                    "| " + " | ".join("---" for _ in headers) + " |"
-                ]
-                for _, r in df.iterrows():
-                    cells = []
-                    for c in df.columns:
-                        v = r[c]
-                        if pd.isna(v): v = ""
-                        v = str(v).replace("\r", " ").replace("\n", " ").strip()
-                        cells.append(v)
-                    lines_tbl.append("| " + " | ".join(cells) + " |")
-                return "\n".join(lines_tbl)
-
-            lines.append(f"**{label}:**")
-            lines.append(to_md_table(out_df, final_headers))
-            lines.append("")
-            rendered = ""  # we've appended directly
+                yield step, value
 
-        else:
-            rendered = render_simple()
-
-        # Capture app name for output filename
-        if label == cfg.get("app_name_field_label", "Application Name") and rendered:
-            app_name = rendered
-
-        # Write to the proper output file
-        if aggregate == "group_by" and rendered.startswith("**"):
-            lines.append(rendered if rendered else f"**{label}:** _(not found)_")
-        elif aggregate not in ("inventory_table", "inventory_summary"):
-            lines.append(f"**{label}:** {rendered if rendered else '_(not found)_'}")
-
-    # --- finalize & write all files ---
-    ts = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-    main_title = cfg.get("doc_title_template", "Application Summary — {app_id}").format(app_id=app_id)
-    if app_name:
-        main_title = f"{app_name} — {app_id}"
-
-    # Prepend headers per file
-    for key, lines in outputs.items():
-        title_tpl = main_title if key == "main" else cfg.get("extra_files", {}).get(key, {}).get("title_template", f"{key} — {{app_id}}")
-        title = title_tpl.format(app_id=app_id, app=(app_name or "App"))
-        lines[:0] = [f"# {title}", "", f"_Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}_", ""]
-        outputs[key] = lines + [""]
-
-    # Determine filenames
-    files_written = []
-    safe_app = sanitize_filename(app_name if app_name else "App")
-    ts = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return app_name, sections()
 
-    # Create a dedicated run folder: ./output/<app>-<id>-<ts>/
-    run_folder = os.path.join(".", "output", f"{safe_app}-{app_id}-{ts}")
-    os.makedirs(run_folder, exist_ok=True)
+def document_keys(plan):
+    # main, plus extra files some field actually emits to
+    emitted = {step.emit_key for step in plan.steps}
+    keys = ["main"] + [key for key in plan.cfg.get("extra_files", {}) if key != "main" and key in emitted]
+    return [key for key in keys if plan.only_files is None or key in plan.only_files]
 
-    # Main file goes inside run_folder
-    if cfg.get("main_filename_template"):
-        fname = cfg["main_filename_template"].format(app_id=app_id, app=safe_app, ts=ts)
-        main_out = os.path.join(run_folder, os.path.basename(fname))
+def document_title(cfg, key, app_id, app_name):
+    if key == "main":
+        title_tpl = cfg.get("doc_title_template", "Application Summary — {app_id}").format(app_id=app_id)
+        if app_name:
+            title_tpl = f"{app_name} — {app_id}"
     else:
-        main_out = os.path.join(run_folder, f"{safe_app}-{app_id}.md")
+        title_tpl = cfg.get("extra_files", {}).get(key, {}).get("title_template", f"{key} — {{app_id}}")
+    return title_tpl.format(app_id=app_id, app=(app_name or "App"))
 
-    # Write main
-    main_text = "\n".join(outputs["main"])
-    with open(main_out, "w", encoding="utf-8") as f:
-        f.write(main_text)
-    files_written.append(main_out)
+def document_header(title):
+    return f"# {title}\n\n_Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}_\n\n"
 
-    # Write extras
-    for key, meta in cfg.get("extra_files", {}).items():
+def document_paths(cfg, plan, app_id, app_name, stable=False):
+    """(run folder, {output key: file path}) for one app; nothing is created."""
+    safe_app = sanitize_filename(app_name if app_name else "App")
+    ts = "latest" if stable else datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    # A dedicated run folder: ./output/<app>-<id>-<ts>/ (or ./output/<app>-<id>/ when stable)
+    run_folder = os.path.join(".", "output", f"{safe_app}-{app_id}" if stable else f"{safe_app}-{app_id}-{ts}")
+
+    # Main file goes inside run_folder (unless --only-files leaves it out)
+    keys = document_keys(plan)
+    targets = {}
+    if "main" in keys:
+        if cfg.get("main_filename_template"):
+            fname = cfg["main_filename_template"].format(app_id=app_id, app=safe_app, ts=ts)
+            targets["main"] = os.path.join(run_folder, os.path.basename(fname))
+        else:
+            targets["main"] = os.path.join(run_folder, f"{safe_app}-{app_id}.md")
+    for key in keys:
         if key == "main":
             continue
-        if key not in outputs:
-            continue  # nothing emitted
-        tpl = meta.get("filename_template", f"{safe_app}-{app_id}-{key}.md")
+        tpl = cfg["extra_files"][key].get("filename_template", f"{safe_app}-{app_id}-{key}.md")
         fname = tpl.format(app_id=app_id, app=safe_app, ts=ts)
-        out_path = os.path.join(run_folder, os.path.basename(fname))
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(outputs[key]))
-            files_written.append(out_path)
+        targets[key] = os.path.join(run_folder, os.path.basename(fname))
+    return run_folder, targets
+
+def extract_fields(cfg, app_id, source_overrides, registry=None, precomputed=None, plan=None, stable=False):
+    """
+    Render one app's documents. stable=True (incremental runs) writes to
+    ./output/<app>-<id>/ with {ts} in filename templates set to "latest",
+    so re-runs overwrite instead of adding timestamped folders.
+    """
+    started = time.perf_counter()
+    registry = registry if registry is not None else SOURCE_REGISTRY
+    plan = plan if plan is not None else compile_plan(cfg, source_overrides)
+
+    # DataFrames per (alias, sheet_name) come from the shared registry
+    registry.saved += sum(key in registry for key in plan.sheet_keys())
+    app_name, sections = render_app(plan, app_id, registry, precomputed)
+    run_folder, targets = document_paths(cfg, plan, app_id, app_name, stable)
+    os.makedirs(run_folder, exist_ok=True)
+
+    # --- stream sections straight into their files (header written on open) ---
+    files_written = []
+    handles = {}
+    def out(key):
+        if key not in handles:
+            f = open(targets[key], "w", encoding="utf-8")
+            handles[key] = f
+            files_written.append(targets[key])
+            f.write(document_header(document_title(cfg, key, app_id, app_name)))
+        return handles[key]
+
+    try:
+        for step, lines, _ in sections:
+            if step.emit_key not in targets:
+                continue  # no file configured for this key
+            with PROFILER.phase("write", step.emit_key):
+                f = out(step.emit_key)
+                for line in lines:
+                    f.write(line + "\n")
+        if "main" in targets and "main" not in handles:
+            open(targets["main"], "w", encoding="utf-8").close()
+            files_written.append(targets["main"])
+    except BaseException:
+        # Never leave half-written documents behind for a failed ID
+        for f in handles.values():
+            f.close()
+        for path in files_written:
+            os.remove(path)
+        if not os.listdir(run_folder):
+            os.rmdir(run_folder)
+        raise
+    finally:
+        for f in handles.values():
+            f.close()
+
+    if PROFILER.enabled:
+        PROFILER.id_times.append((app_id, time.perf_counter() - started))
+    return files_written, app_name or ""
+
+# ------------------------
+# NEW: background document writer (--write-threads, --bundle)
+# ------------------------
+def app_documents(plan, app_id, registry=None, precomputed=None):
+    """One app's Markdown in memory: (app_name, {output key: document text})."""
+    cfg = plan.cfg
+    app_name, sections = render_app(plan, app_id, registry, precomputed)
+    keys = set(document_keys(plan))
+    parts = {}
+    for step, lines, _ in sections:
+        if step.emit_key not in keys:
+            continue
+        if step.emit_key not in parts:
+            parts[step.emit_key] = [document_header(document_title(cfg, step.emit_key, app_id, app_name))]
+        parts[step.emit_key].extend(line + "\n" for line in lines)
+    if "main" in keys and "main" not in parts:
+        parts["main"] = []
+    return app_name, {key: "".join(chunks) for key, chunks in parts.items()}
+
+def render_documents(plan, app_id, registry=None, precomputed=None, stable=False):
+    """
+    Same documents as extract_fields(), rendered into memory for the
+    background writer: (run_folder, {path: text}, app_name).
+    """
+    registry = registry if registry is not None else SOURCE_REGISTRY
+    registry.saved += sum(key in registry for key in plan.sheet_keys())
+    started = time.perf_counter()
+    app_name, docs = app_documents(plan, app_id, registry, precomputed)
+    run_folder, targets = document_paths(plan.cfg, plan, app_id, app_name, stable)
+    if PROFILER.enabled:
+        PROFILER.id_times.append((app_id, time.perf_counter() - started))
+    return run_folder, {targets[key]: text for key, text in docs.items()}, app_name or ""
+
+def write_documents(run_folder, docs):
+    # All of an app's files or none of them
+    written = []
+    os.makedirs(run_folder, exist_ok=True)
+    try:
+        for path, text in docs.items():
+            with open(path, "w", encoding="utf-8") as f:
+                written.append(path)
+                f.write(text)
+    except BaseException:
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.isdir(run_folder) and not os.listdir(run_folder):
+            os.rmdir(run_folder)
+        raise
+    return written
+
+class DocumentBundle:
+    """
+    One .zip / .tar / .tar.gz archive holding every document of a batch,
+    under the same <run folder>/<file> names the folders would get.
+    Not thread-safe: the BackgroundWriter feeds it from a single thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        lower = path.lower()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if lower.endswith(".zip"):
+            import zipfile
+            self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+            self.tar = None
+        elif lower.endswith((".tar", ".tar.gz", ".tgz")):
+            import tarfile
+            self.zip = None
+            self.tar = tarfile.open(path, "w:gz" if lower.endswith(("gz", "tgz")) else "w")
+        else:
+            raise ValueError(f"Unsupported bundle type for '{path}'. Use .zip, .tar, .tar.gz or .tgz.")
+
+    def write(self, run_folder, docs):
+        import io, tarfile
+        names = []
+        for path, text in docs.items():
+            name = os.path.relpath(path, os.path.join(".", "output")).replace(os.sep, "/")
+            data = text.encode("utf-8")
+            if self.zip is not None:
+                self.zip.writestr(name, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = time.time()
+                self.tar.addfile(info, io.BytesIO(data))
+            names.append(f"{self.path}:{name}")
+        return names
+
+    def close(self):
+        (self.zip or self.tar).close()
+
+class BackgroundWriter:
+    """
+    Writes rendered documents on worker threads while the caller renders
+    the next IDs. At most `max_pending` apps are buffered (submit() blocks
+    on the oldest beyond that); outcomes come back in submission order as
+    (app_id, files_written, error) so a failed write is reported against
+    its own ID.
+    """
+    def __init__(self, threads=4, bundle=None):
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+        self.bundle = DocumentBundle(bundle) if bundle else None
+        threads = 1 if self.bundle else max(1, threads)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.pending = deque()
+        self.max_pending = threads * 4
+
+    def _write(self, run_folder, docs):
+        with PROFILER.phase("write", "background"):
+            if self.bundle is not None:
+                return self.bundle.write(run_folder, docs)
+            return write_documents(run_folder, docs)
+
+    def _outcome(self, app_id, future):
+        try:
+            return app_id, future.result(), None
+        except Exception as e:
+            return app_id, [], e
+
+    def submit(self, app_id, run_folder, docs):
+        """Queue one app's documents; returns the outcomes finished so far."""
+        self.pending.append((app_id, self.pool.submit(self._write, run_folder, docs)))
+        finished = []
+        while self.pending and (len(self.pending) > self.max_pending or self.pending[0][1].done()):
+            finished.append(self._outcome(*self.pending.popleft()))
+        return finished
+
+    def drain(self):
+        finished = [self._outcome(*p) for p in self.pending]
+        self.pending.clear()
+        return finished
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        if self.bundle is not None:
+            self.bundle.close()
+
+# ------------------------
+# NEW: structured output backends (--format jsonl/csv/parquet)
+# ------------------------
+FLAT_COLUMNS = ["app_id", "app_name", "file", "field", "aggregate", "value"]
+
+def app_record(plan, app_id, registry=None, precomputed=None):
+    """
+    One app's structured result: {"app_id", "app_name", "fields": [{"label",
+    "file", "aggregate", "value"}]} with each aggregate's value as computed
+    (str, list, dict or {"headers", "rows"}), not its Markdown.
+    """
+    started = time.perf_counter()
+    app_name, sections = render_app(plan, app_id, registry, precomputed, formatted=False)
+    keys = set(document_keys(plan))
+    fields = [
+        {"label": step.label, "file": step.emit_key, "aggregate": step.aggregate or "single", "value": value}
+        for step, value in sections if step.emit_key in keys
+    ]
+    if PROFILER.enabled:
+        PROFILER.id_times.append((app_id, time.perf_counter() - started))
+    return {"app_id": str(app_id), "app_name": app_name or "", "fields": fields}
+
+def _flat_rows(record):
+    # Long layout for tabular formats: one row per field; non-text values as JSON
+    for fld in record["fields"]:
+        value = fld["value"]
+        yield [record["app_id"], record["app_name"], fld["file"], fld["label"], fld["aggregate"],
+               value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)]
+
+class JsonLinesWriter:
+    """One JSON object per app (the app_record shape)."""
+    extension = ".jsonl"
+
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.f.close()
+
+class CsvWriter:
+    """One row per (app, field); see FLAT_COLUMNS."""
+    extension = ".csv"
+
+    def __init__(self, path):
+        import csv
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(FLAT_COLUMNS)
+
+    def write(self, record):
+        self.writer.writerows(_flat_rows(record))
+
+    def close(self):
+        self.f.close()
+
+class ParquetWriter:
+    """Same rows as CsvWriter, all string columns, written in row groups. Needs pyarrow."""
+    extension = ".parquet"
+    row_group_size = 50_000
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("--format parquet needs pyarrow (pip install pyarrow).")
+        self.pa = pa
+        self.schema = pa.schema([(c, pa.string()) for c in FLAT_COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = []
+
+    def write(self, record):
+        self.rows.extend(_flat_rows(record))
+        if len(self.rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            columns = [list(col) for col in zip(*self.rows)]
+            self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+OUTPUT_WRITERS = {
+    "jsonl": JsonLinesWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+}
+
+def open_output_writer(fmt, path=None, stem="apps"):
+    """Writer for one consolidated file: `path`, or ./output/<stem>-<ts>.<ext>."""
+    cls = OUTPUT_WRITERS[fmt]
+    if not path:
+        ts = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(".", "output", f"{sanitize_filename(stem)}-{ts}{cls.extension}")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return cls(path), path
+
+# ------------------------
+# NEW: library API -- many App IDs per call, no CLI
+# ------------------------
+def extract_many(cfg, app_ids, source_overrides=None, only_files=None, registry=None, markdown=False, chunk_size=1000):
+    """
+    Yield (app_id, error_or_None, result) for every App ID in `app_ids`, in
+    order and lazily: any iterable works (a generator or a streamed ID file)
+    and repeats (by normalized ID) are skipped. result is the app_record()
+    dict, or {output key: Markdown text} with markdown=True; nothing is
+    written to disk.
+
+    cfg is never modified and is copied up front, so one config can back
+    concurrent calls. Sources are loaded and indexed once per call into
+    `registry` (a fresh SourceRegistry unless one is passed in to share
+    parsed sheets between calls); IDs are taken `chunk_size` at a time and
+    each chunk's fields are computed together by the batch engine.
+    """
+    plan = compile_plan(copy.deepcopy(cfg), source_overrides, only_files)
+    registry = registry if registry is not None else SourceRegistry()
+    plan.load(registry)
+    seen = set()
+    chunk = []
+
+    def results(chunk):
+        precomputed = precompute_fields(plan, chunk, registry)
+        for app_id in chunk:
+            try:
+                if markdown:
+                    result = app_documents(plan, app_id, registry, precomputed)[1]
+                else:
+                    result = app_record(plan, app_id, registry, precomputed)
+            except Exception as e:
+                yield app_id, e, None
+                continue
+            yield app_id, None, result
 
-    return main_text, app_name or ""
+    for app_id in app_ids:
+        app_id = str(app_id).strip()
+        if not app_id or normalize_id(app_id) in seen:
+            continue
+        seen.add(normalize_id(app_id))
+        chunk.append(app_id)
+        if len(chunk) >= chunk_size:
+            yield from results(chunk)
+            chunk = []
+    if chunk:
+        yield from results(chunk)
 
 # ------------------------
 # NEW: batch ID utilities
 # ------------------------
-def _strip_and_keep(s: str) -> str:
-    return re.sub(r"\s+", "", s)
+_ID_COLUMN_GUESSES = ["app_id", "application_id", "appid", "applicationid", "id"]
+_ID_SEPARATORS = re.compile(r"[,;\t ]+")
+
+def _pick_id_column(columns, ids_col=None):
+    # ids_col if present, else a column named like 'app_id', else the first column
+    if ids_col and ids_col in columns:
+        return columns.index(ids_col)
+    lowered = {}
+    for pos, c in enumerate(columns):
+        lowered.setdefault(str(c).lower(), pos)
+    for guess in _ID_COLUMN_GUESSES:
+        if guess in lowered:
+            return lowered[guess]
+    return 0
+
+def _ids_from_txt(path):
+    # one ID per line, or comma/semicolon/tab/space separated
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield from _ID_SEPARATORS.split(line)
+
+def _ids_from_csv(path, ids_col=None):
+    import csv
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if not header:
+            return
+        pos = _pick_id_column(header, ids_col)
+        for row in rows:
+            if pos < len(row):
+                yield row[pos]
+
+def _ids_from_xlsx(path, ids_col=None):
+    # read-only: only the ID column of the first sheet is ever materialized
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[wb.sheetnames[0]]
+        ws.reset_dimensions()
+        header = [_excel_value(c) for c in next(ws.iter_rows(max_row=1), ())]
+        if not header:
+            return
+        pos = _pick_id_column([str(c) for c in header], ids_col) + 1
+        for (cell,) in ws.iter_rows(min_row=2, min_col=pos, max_col=pos):
+            yield str(_excel_value(cell))
+    finally:
+        wb.close()
 
-def load_app_ids_from_file(path: str, ids_col: str = None):
+def iter_app_ids_from_file(path: str, ids_col: str = None):
     """
-    Accepts CSV, TXT, or Excel.
+    Stream App IDs from a CSV, TXT or Excel file as they are read.
     - TXT: one ID per line, or comma/space separated.
-    - CSV/XLSX: tries to auto-detect a column named like 'app_id' if ids_col not provided.
-    Returns a list[str] of non-empty IDs (order preserved, duplicates removed).
+    - CSV/XLSX: only the ID column is read; a column named like 'app_id' is
+      picked if ids_col is not provided, else the first column.
+    - Any other extension is read as CSV.
+    IDs are stripped; blanks and repeats (compared like lookups compare
+    them, via normalize_id) are skipped, keeping the first spelling.
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f"IDs file not found: {path}")
-
-    ids = []
-
     ext = os.path.splitext(path)[1].lower()
+    if ext == ".txt":
+        raw = _ids_from_txt(path)
+    elif ext in (".xlsx", ".xls"):
+        raw = _ids_from_xlsx(path, ids_col)
+    else:
+        raw = _ids_from_csv(path, ids_col)
+
+    seen = set()
     try:
-        if ext in [".csv"]:
-            df = pd.read_csv(path, dtype=str, keep_default_na=False)
-            ids = _extract_ids_from_df(df, ids_col)
-        elif ext in [".xlsx", ".xls"]:
-            df = pd.read_excel(path, dtype=str, keep_default_na=False, engine="openpyxl")
-            ids = _extract_ids_from_df(df, ids_col)
-        elif ext in [".txt"]:
-            with open(path, "r", encoding="utf-8") as f:
-                raw = f.read()
-            # allow \n, comma, semi-colon, spaces
-            parts = re.split(r"[,\n;\t ]+", raw)
-            ids = [p.strip() for p in parts if p and p.strip()]
-        else:
-            # Fallback: try CSV first, then TXT
-            try:
-                df = pd.read_csv(path, dtype=str, keep_default_na=False)
-                ids = _extract_ids_from_df(df, ids_col)
-            except Exception:
-                with open(path, "r", encoding="utf-8") as f:
-                    raw = f.read()
-                parts = re.split(r"[,\n;\t ]+", raw)
-                ids = [p.strip() for p in parts if p and p.strip()]
+        for value in raw:
+            app_id = value.strip()
+            key = normalize_id(app_id)
+            if not app_id or key in seen:
+                continue
+            seen.add(key)
+            yield app_id
     except Exception as e:
         raise ValueError(f"Failed to parse IDs from '{path}': {e}")
-
-    # de-dup while preserving order; ignore blank
-    seen = set()
-    final = []
-    for i in ids:
-        key = _strip_and_keep(str(i))
-        if not key or key in seen:
-            continue
-        seen.add(key)
-        final.append(i)
-    if not final:
+    if not seen:
         raise ValueError("No valid app IDs found in IDs file.")
-    return final
 
-def _extract_ids_from_df(df: pd.DataFrame, ids_col: str = None):
-    if df is None or df.empty:
-        return []
-    cols = [c for c in df.columns]
-    pick = None
-    if ids_col and ids_col in cols:
-        pick = ids_col
+def load_app_ids_from_file(path: str, ids_col: str = None):
+    """All IDs of iter_app_ids_from_file() as a list[str] (order preserved, duplicates removed)."""
+    return list(iter_app_ids_from_file(path, ids_col))
+
+# ------------------------
+# NEW: incremental batch runs (--incremental)
+# ------------------------
+MANIFEST_PATH = os.path.join(".", "output", ".manifest.json")
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def fingerprint_ids(plan, app_ids, registry=None):
+    """
+    {app_id: hex digest} over everything that shapes an app's documents:
+    the config (minus source paths) and, for every lookup, the app's
+    matched rows in the columns the plan reads. Each sheet is hashed once
+    per row; an app's fingerprint only combines its rows' hashes.
+    """
+    registry = registry if registry is not None else SOURCE_REGISTRY
+    plan.load(registry)
+    cfg_part = {k: v for k, v in plan.cfg.items() if k != "sources"}
+    cfg_part["--only-files"] = sorted(plan.only_files) if plan.only_files is not None else None
+    base = hashlib.sha1(json.dumps(cfg_part, sort_keys=True, default=str).encode("utf-8"))
+
+    row_hashes = {}
+    for lookup in plan.lookups:
+        alias, sheet, _ = lookup
+        if (alias, sheet) not in row_hashes:
+            df = plan.get_df(registry, alias, sheet)
+            cols = sorted((c for c in plan.load_columns[alias][sheet] if c in df.columns), key=str)
+            base.update(repr((alias, sheet, cols)).encode("utf-8"))
+            row_hashes[(alias, sheet)] = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    indexes = {lookup: registry.get_index(lookup[0], plan.sources[lookup[0]]["path"], *lookup[1:]) for lookup in plan.lookups}
+    multi_hop = [step for step in plan.steps if step.aggregate == "dependencies" and step.depth != 1]
+
+    out = {}
+    for app_id in app_ids:
+        h = base.copy()
+        h.update(str(app_id).encode("utf-8"))
+        key = normalize_id(app_id)
+        for lookup in plan.lookups:
+            positions = indexes[lookup].get(key, [])
+            h.update(repr(lookup).encode("utf-8"))
+            h.update(row_hashes[lookup[:2]][positions].tobytes())
+        for step in multi_hop:  # rows further away than the app's own can change these
+            h.update(json.dumps(plan.dependencies(registry, step, app_id)).encode("utf-8"))
+        out[app_id] = h.hexdigest()
+    return out
+
+def unchanged_ids(manifest, fingerprints):
+    # Same fingerprint and every file from the last render still on disk
+    return {
+        app_id for app_id, fp in fingerprints.items()
+        if manifest.get(app_id, {}).get("fingerprint") == fp
+        and all(os.path.exists(f) for f in manifest[app_id].get("files", []))
+    }
+
+def record_render(manifest, app_id, fingerprint, files_written):
+    # Drop files from the previous render that this one did not rewrite (e.g. the app was renamed)
+    for old in manifest.get(app_id, {}).get("files", []):
+        if old not in files_written and os.path.exists(old):
+            os.remove(old)
+            folder = os.path.dirname(old)
+            if os.path.isdir(folder) and not os.listdir(folder):
+                os.rmdir(folder)
+    manifest[app_id] = {"fingerprint": fingerprint, "files": files_written}
+
+# ------------------------
+# NEW: portfolio-wide dependency graph export (--export-graph)
+# ------------------------
+def export_dependency_graphs(plan, path, registry=None):
+    """
+    Write each dependency graph of the plan (one per source sheet and column
+    pair) to `path`. .json: {"graphs": [{"source", "sheet", "from_column",
+    "to_column", "nodes", "edges"}]}; anything else: CSV, one row per edge.
+    Returns the number of edges written.
+    """
+    registry = registry if registry is not None else SOURCE_REGISTRY
+    plan.load(registry)
+    graphs = []
+    for step in plan.steps:
+        graph = plan.dependency_graph(registry, step)
+        if graph is not None and all(graph is not g for _, g in graphs):
+            graphs.append((step, graph))
+    if not graphs:
+        raise ValueError("Config has no 'dependencies' fields to build a graph from.")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    edges = 0
+    if path.lower().endswith(".json"):
+        out = []
+        for step, graph in graphs:
+            pairs = [list(edge) for edge in graph.edges()]
+            edges += len(pairs)
+            out.append({"source": step.alias, "sheet": step.sheet, "from_column": graph.from_column, "to_column": graph.to_column,
+                        "nodes": sorted(set(graph.names.values())), "edges": pairs})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"graphs": out}, f, indent=2, ensure_ascii=False)
     else:
-        # heuristic: prefer columns named like 'app_id', 'application_id', 'appid', else take the first column
-        lowered = {c.lower(): c for c in cols}
-        for guess in ["app_id", "application_id", "appid", "applicationid", "id"]:
-            if guess in lowered:
-                pick = lowered[guess]
-                break
-        if pick is None:
-            pick = cols[0]
-    series = df[pick].astype(str)
-    return [s.strip() for s in series if s and str(s).strip()]
+        import csv
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["source", "sheet", "from_column", "to_column", "from_id", "to_id"])
+            for step, graph in graphs:
+                for source, target in graph.edges():
+                    w.writerow([step.alias, step.sheet, graph.from_column, graph.to_column, source, target])
+                    edges += 1
+    return edges
+
+def render_one(mode, plan, app_id, precomputed=None, stable=False):
+    """
+    One batch ID. mode "files": write its Markdown, return the paths;
+    "docs": (run_folder, {path: text}) for the BackgroundWriter;
+    "record": its app_record() for a structured output writer.
+    """
+    if mode == "record":
+        return app_record(plan, app_id, precomputed=precomputed)
+    if mode == "docs":
+        run_folder, docs, _ = render_documents(plan, app_id, precomputed=precomputed, stable=stable)
+        return run_folder, docs
+    files_written, _ = extract_fields(plan.cfg, app_id, {}, precomputed=precomputed, plan=plan, stable=stable)
+    return files_written
 
 # ------------------------
+# NEW: parallel batch (--workers)
+# ------------------------
+_worker_state = {}
+
+def _init_worker(plan, precomputed, stable, mode, profile, registry=None):
+    # fork: the parent's preloaded SOURCE_REGISTRY is inherited as-is.
+    # spawn: the registry arrives here once per worker, never per task.
+    global SOURCE_REGISTRY
+    if registry is not None:
+        SOURCE_REGISTRY = registry
+    _worker_state["plan"] = plan
+    _worker_state["precomputed"] = precomputed
+    _worker_state["stable"] = stable
+    _worker_state["mode"] = mode
+    PROFILER.reset()  # forked children start with a copy of the parent's numbers
+    PROFILER.enabled = profile
+
+def _run_one(app_id):
+    saved_before = SOURCE_REGISTRY.saved
+    plan = _worker_state["plan"]
+    result, error = None, None
+    try:
+        result = render_one(_worker_state["mode"], plan, app_id, _worker_state["precomputed"], _worker_state["stable"])
+    except Exception as e:
+        error = str(e)
+    profile = PROFILER.drain() if PROFILER.enabled else None
+    return app_id, error, result, SOURCE_REGISTRY.saved - saved_before, profile
 
-def main():
-    p = argparse.ArgumentParser(description="Extract app data from multiple Excel workbooks into Markdown summaries.")
-    grp = p.add_mutually_exclusive_group(required=True)
-    grp.add_argument("--app-id", help="Single Application ID to look up (original behavior).")
-    grp.add_argument("--ids-file", help="Path to a file containing multiple Application IDs (CSV/XLSX/TXT).")
-    p.add_argument("--ids-col", help="(Optional) Column name to read IDs from when using --ids-file for CSV/XLSX.")
-    p.add_argument("--config", required=True, help="Path to JSON config defining sources and fields.")
-    p.add_argument("--out", required=False, help="(Unused for batch). For single ID, custom output filename. Otherwise ignored.")
-    p.add_argument("--source", action="append", help="Override a source path like A=/path/to/file.xlsx (can repeat).")
-    args = p.parse_args()
+def run_batch_parallel(plan, app_ids, workers, precomputed=None, stable=False, mode="files"):
+    """
+    Yields (app_id, error_or_None, result) in input order, result being
+    render_one()'s for `mode`. Sources are loaded and indexed (and batch
+    values precomputed) once in the parent before the pool starts; workers
+    never write consolidated output files or bundles.
+    """
+    import multiprocessing as mp
+    plan.load(SOURCE_REGISTRY)
+    if "fork" in mp.get_all_start_methods():
+        ctx, initargs = mp.get_context("fork"), (plan, precomputed, stable, mode, PROFILER.enabled)
+    else:
+        ctx, initargs = mp.get_context("spawn"), (plan, precomputed, stable, mode, PROFILER.enabled, SOURCE_REGISTRY)
+    chunksize = max(1, len(app_ids) // (workers * 8))
+    with ctx.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for app_id, error, result, saved, profile in pool.imap(_run_one, app_ids, chunksize=chunksize):
+            SOURCE_REGISTRY.saved += saved
+            if profile:
+                PROFILER.merge(profile)
+            yield app_id, error, result
+
+# ------------------------
 
+def write_profile(path, cprof, wall):
+    if cprof is not None:
+        cprof.disable()
+    PROFILER.report()
+    print(f"Wall time: {wall:.2f}s")
+    if not path:
+        return
+    if cprof is not None:
+        cprof.dump_stats(path)  # view with: python -m pstats <path>
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(PROFILER.to_json(), wall_seconds=wall), f, indent=1)
+    print(f"Profile written to {path}")
+
+def run(args):
     try:
         with open(args.config, "r", encoding="utf-8") as f:
             cfg = json.load(f)
         overrides = parse_source_overrides(args.source)
+        only_files = [k.strip() for k in args.only_files.split(",") if k.strip()] if args.only_files else None
+        plan = compile_plan(cfg, overrides, only_files)  # config errors surface here, before any parsing
+        if args.cache_dir:
+            SOURCE_REGISTRY.disk_cache = ColumnarCache(args.cache_dir)
+        SOURCE_REGISTRY.low_memory = args.low_memory
+
+        if args.serve:
+            from server import AppServer, serve
+            serve(AppServer(plan, SOURCE_REGISTRY, poll_seconds=args.poll), host=args.host, port=args.port, socket_path=args.socket)
+            return
+
+        if args.export_graph:
+            edges = export_dependency_graphs(plan, args.export_graph)
+            SOURCE_REGISTRY.report()
+            print(f"Wrote {args.export_graph} ({edges} dependency edge(s)).")
+            return
 
+        structured = args.format != "markdown"
         if args.app_id:
-            # Single-run (original)
-            md, app_name = extract_fields(cfg, args.app_id, overrides)
+            if args.low_memory:
+                SOURCE_REGISTRY.only_ids = {normalize_id(args.app_id)}
+            if structured:
+                writer, out_path = open_output_writer(args.format, args.out, stem=str(args.app_id))
+                try:
+                    writer.write(app_record(plan, args.app_id))
+                finally:
+                    writer.close()
+                print(f"Wrote {out_path}")
+            else:
+                # Single-run (original)
+                files_written, app_name = extract_fields(cfg, args.app_id, overrides, plan=plan)
+            SOURCE_REGISTRY.report()
             print("Done.")
             return
 
         # Batch mode
         app_ids = load_app_ids_from_file(args.ids_file, ids_col=args.ids_col)
         print(f"Found {len(app_ids)} app id(s) to process.")
+        if args.low_memory:
+            SOURCE_REGISTRY.only_ids = {normalize_id(a) for a in app_ids}
+        plan.load(SOURCE_REGISTRY)  # parse + validate columns once, before any ID
+        manifest, fingerprints = {}, {}
+        if args.incremental:
+            manifest = load_manifest()
+            fingerprints = fingerprint_ids(plan, app_ids)
+            skip = unchanged_ids(manifest, fingerprints)
+            total = len(app_ids)
+            app_ids = [a for a in app_ids if a not in skip]
+            print(f"Incremental: {total - len(app_ids)} unchanged, {len(app_ids)} to render.")
         errors = []
-        for i, app_id in enumerate(app_ids, start=1):
-            try:
-                print(f"[{i}/{len(app_ids)}] Processing {app_id} ...")
-                extract_fields(cfg, app_id, overrides)
-            except Exception as e:
-                msg = f"{app_id}: {e}"
-                errors.append(msg)
-                print(f"ERROR: {msg}", file=sys.stderr)
+        precomputed = {}
+        if not args.per_id and app_ids:
+            started = time.perf_counter()
+            precomputed = precompute_fields(plan, app_ids)
+            print(f"Batch engine: {len(precomputed)} field(s) precomputed for all IDs in {time.perf_counter() - started:.2f}s.")
+
+        writer = background = None
+        if structured:
+            mode = "record"
+            stem = os.path.splitext(os.path.basename(args.config))[0]
+            writer, out_path = open_output_writer(args.format, args.out, stem=stem)
+        elif args.bundle or (args.write_threads > 0 and args.workers == 1):
+            mode = "docs"  # render here (or in workers), write on background threads
+            background = BackgroundWriter(args.write_threads, bundle=args.bundle)
+        else:
+            mode = "files"
+
+        def done(app_id, result):
+            if writer is not None:
+                writer.write(result)
+            elif background is not None:
+                settle(background.submit(app_id, *result))
+            else:
+                written(app_id, result)
+
+        def written(app_id, files_written):
+            if args.incremental:
+                record_render(manifest, app_id, fingerprints[app_id], files_written)
+
+        def settle(outcomes):
+            # background writes finish after their ID was rendered
+            for written_id, files_written, error in outcomes:
+                if error:
+                    failed(written_id, f"write failed: {error}")
+                else:
+                    written(written_id, files_written)
+
+        def failed(app_id, error):
+            msg = f"{app_id}: {error}"
+            errors.append(msg)
+            print(f"ERROR: {msg}", file=sys.stderr)
+            manifest.pop(app_id, None)  # force a re-render next time
+
+        try:
+            if args.workers > 1 and len(app_ids) > 1:
+                results = run_batch_parallel(plan, app_ids, args.workers, precomputed, stable=args.incremental, mode=mode)
+                for i, (app_id, error, result) in enumerate(results, start=1):
+                    print(f"[{i}/{len(app_ids)}] Processing {app_id} ...")
+                    if error:
+                        failed(app_id, error)
+                    else:
+                        done(app_id, result)
+            else:
+                for i, app_id in enumerate(app_ids, start=1):
+                    try:
+                        print(f"[{i}/{len(app_ids)}] Processing {app_id} ...")
+                        result = render_one(mode, plan, app_id, precomputed, stable=args.incremental)
+                    except Exception as e:
+                        failed(app_id, e)
+                        continue
+                    done(app_id, result)
+            if background is not None:
+                settle(background.drain())
+        finally:
+            if args.incremental:
+                save_manifest(manifest)
+            if writer is not None:
+                writer.close()
+                print(f"Wrote {out_path}")
+            if background is not None:
+                background.close()
+                if args.bundle:
+                    print(f"Wrote {args.bundle}")
+
+        SOURCE_REGISTRY.report()
 
         if errors:
             print("\nCompleted with errors for the following IDs:", file=sys.stderr)
@@ -506,6 +1926,59 @@ def main():
         print(f"ERROR: {e}", file=sys.stderr)
         sys.exit(1)
 
+def main():
+    p = argparse.ArgumentParser(description="Extract app data from multiple Excel workbooks into Markdown summaries.")
+    grp = p.add_mutually_exclusive_group(required=True)
+    grp.add_argument("--app-id", help="Single Application ID to look up (original behavior).")
+    grp.add_argument("--ids-file", help="Path to a file containing multiple Application IDs (CSV/XLSX/TXT).")
+    grp.add_argument("--serve", action="store_true", help="Run as a long-lived server answering per-app requests from resident sources.")
+    grp.add_argument("--export-graph", metavar="PATH", help="Write the whole portfolio's dependency graph (from the config's dependencies fields) to PATH (.json or .csv) and exit.")
+    p.add_argument("--ids-col", help="(Optional) Column name to read IDs from when using --ids-file for CSV/XLSX.")
+    p.add_argument("--config", required=True, help="Path to JSON config defining sources and fields.")
+    p.add_argument("--out", required=False, help="Output file for --format jsonl/csv/parquet (batch: the one consolidated file). Default: ./output/<config or ID>-<timestamp>.<ext>. Ignored for Markdown.")
+    p.add_argument("--format", choices=["markdown"] + list(OUTPUT_WRITERS), default="markdown", help="Output format. markdown (default) writes per-app folders; jsonl/csv/parquet write one file with every app's structured field values.")
+    p.add_argument("--source", action="append", help="Override a source path like A=/path/to/file.xlsx (can repeat).")
+    p.add_argument("--cache-dir", help="(Optional) Keep columnar (Feather) copies of parsed source sheets here; reused until a workbook changes. Needs pyarrow.")
+    p.add_argument("--workers", type=int, default=1, help="(Batch only) Number of worker processes. Default: 1 (serial).")
+    p.add_argument("--write-threads", type=int, default=0, help="(Batch, Markdown) Render each app's documents in memory and write them on N background threads while the next IDs render. Default: 0 (stream sections straight to their files).")
+    p.add_argument("--bundle", help="(Batch, Markdown) Put every document into one .zip/.tar/.tar.gz archive instead of ./output folders.")
+    p.add_argument("--low-memory", action="store_true", help="Stream source sheets row by row, keeping only referenced columns and only the rows of the requested App ID(s). Not combinable with --cache-dir.")
+    p.add_argument("--only-files", help="Comma-separated outputs to write, e.g. main,servers (keys of extra_files). Sources feeding only other files are not loaded.")
+    p.add_argument("--per-id", action="store_true", help="(Batch only) Compute every field per ID instead of with the vectorized batch engine.")
+    p.add_argument("--incremental", action="store_true", help="(Batch only) Only re-render IDs whose source rows or config changed since the last incremental run; writes to stable ./output/<app>-<id>/ folders.")
+    p.add_argument("--host", default="127.0.0.1", help="(Serve only) Interface to listen on. Default: 127.0.0.1")
+    p.add_argument("--port", type=int, default=8765, help="(Serve only) HTTP port. Default: 8765")
+    p.add_argument("--socket", help="(Serve only) Listen on this Unix socket path instead of TCP.")
+    p.add_argument("--poll", type=float, default=2.0, help="(Serve only) Seconds between source file change checks. Default: 2")
+    p.add_argument("--profile", action="store_true", help="Print per-phase timings and counters (parse, index, lookup, aggregate, format, write) at the end.")
+    p.add_argument("--profile-out", help="With --profile: write a JSON trace (*.json) or cProfile stats (any other extension, e.g. run.prof) here.")
+    args = p.parse_args()
+    if args.workers < 1:
+        p.error("--workers must be >= 1")
+    if args.incremental and args.format != "markdown":
+        p.error("--incremental only applies to --format markdown")
+    if args.bundle and (args.format != "markdown" or args.incremental):
+        p.error("--bundle only applies to --format markdown without --incremental")
+    if args.write_threads < 0:
+        p.error("--write-threads must be >= 0")
+    if args.low_memory and args.cache_dir:
+        p.error("--low-memory and --cache-dir can't be combined")
+
+    cprof = None
+    if args.profile or args.profile_out:
+        PROFILER.enabled = True
+        if args.profile_out and not args.profile_out.lower().endswith(".json"):
+            import cProfile
+            cprof = cProfile.Profile()
+            cprof.enable()
+    started = time.perf_counter()
+    try:
+        run(args)
+    finally:
+        if PROFILER.enabled:
+            write_profile(args.profile_out, cprof, time.perf_counter() - started)
+
 if __name__ == "__main__":
+    sys.modules.setdefault("extract_app_data", sys.modules[__name__])  # server.py imports this running module, not a second copy
     main()
 
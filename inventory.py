@@ -0,0 +1,191 @@
+# inventory.py
+"""
+Server / OS inventory engine shared by extract_app_data.py and summary.py.
+
+Environment normalization and DB-host detection live here only. Inventory
+columns are interned once (InventoryCodes): each row gets a small integer
+code per column, and normalize_env / is_db_host run once per distinct value.
+Summaries for any number of apps are then cheap set operations on codes.
+
+Input is either a pandas DataFrame or an iterable of dict rows; pandas is
+only imported for DataFrames.
+"""
+import re
+from collections import defaultdict
+
+ENV_NORMALIZE = {
+    "prod": "Production",
+    "production": "Production",
+    "prd": "Production",
+    "test": "Test",
+    "tst": "Test",
+    "uat": "UAT",
+    "dev": "Dev",
+    "development": "Dev",
+}
+DB_NAME_PATTERN = re.compile(r'(^|[^a-z])(db|sql|ora)(\d+)?($|[^a-z])', re.IGNORECASE)
+
+# env, server, OS name, OS version
+COLUMNS = ("ENVIRONMENT", "SERVER", "OS_NAME", "OS_VERSION")
+
+def is_na(value) -> bool:
+    # None, NaN, NaT and pd.NA, without importing pandas
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except (TypeError, ValueError):
+        return True
+
+def normalize_env(env) -> str:
+    if is_na(env) or not str(env).strip():
+        return "Unknown"
+    key = str(env).strip().lower()
+    return ENV_NORMALIZE.get(key, str(env).strip().title())
+
+def is_db_host(server_name) -> bool:
+    if is_na(server_name) or not str(server_name).strip():
+        return False
+    return bool(DB_NAME_PATTERN.search(str(server_name)))
+
+def normalize_app_id(value) -> str:
+    return str(value).strip().upper()
+
+def normalize_app_id_series(series):
+    """normalize_app_id over a pandas Series, vectorized."""
+    return series.astype(str).str.strip().str.upper()
+
+def inventory_result(envs, servers_by_env, os_names, os_versions, db_by_env):
+    return {
+        "Environments": sorted(envs),
+        "Servers by Environment": {env: sorted(svrs) for env, svrs in sorted(servers_by_env.items()) if svrs},
+        "Operating System": sorted(os_names),
+        "OS Version": sorted(os_versions),
+        "Database Servers by Environment": {env: sorted(h) for env, h in sorted(db_by_env.items()) if h},
+    }
+
+def empty_result():
+    return inventory_result(set(), {}, set(), set(), {})
+
+def _env_name(text):
+    return "Unknown" if text is None else normalize_env(text)
+
+def _stripped(text):
+    return "" if text is None else text.strip()
+
+def _intern(values, na, normalize):
+    # (int32 code per row, distinct normalized values). normalize() runs once
+    # per distinct cell text (None for NA); texts that normalize alike share a code.
+    by_text = {}
+    by_name = {}
+    codes = []
+    for v, n in zip(values, na):
+        t = None if n else str(v)
+        c = by_text.get(t)
+        if c is None:
+            c = by_text[t] = by_name.setdefault(normalize(t), len(by_name))
+        codes.append(c)
+    return codes, list(by_name)
+
+class InventoryCodes:
+    """
+    Interned inventory columns (env, server, OS name, OS version): a small
+    integer code per row into tables of distinct, already normalized values,
+    with is_db_host worked out once per distinct server. summarize() takes
+    row positions; build once per source and reuse for every app.
+    """
+    def __init__(self, env, server, os_name, os_version):
+        # each argument: (cell values, NA flags), all the same length
+        self.env, self.env_names = self._codes(*env, _env_name)
+        self.server, self.server_names = self._codes(*server, _stripped)
+        self.os_name, self.os_names = self._codes(*os_name, _stripped)
+        self.os_version, self.os_versions = self._codes(*os_version, _stripped)
+        self.server_is_db = [bool(name) and is_db_host(name) for name in self.server_names]
+
+    @staticmethod
+    def _codes(values, na, normalize):
+        codes, names = _intern(values, na, normalize)
+        try:
+            import numpy as np
+            codes = np.array(codes, dtype=np.int32)
+        except ImportError:
+            pass
+        return codes, names
+
+    @classmethod
+    def from_frame(cls, df, columns=COLUMNS):
+        import pandas as pd
+        cells = []
+        for col in columns:
+            vals = df[col].to_numpy(dtype=object)
+            cells.append((vals, pd.isna(vals)))
+        return cls(*cells)
+
+    @classmethod
+    def from_rows(cls, rows, columns=COLUMNS):
+        cols = [([], []) for _ in columns]
+        for r in rows:
+            for (vals, na), col in zip(cols, columns):
+                v = r.get(col)
+                vals.append(v)
+                na.append(is_na(v))
+        return cls(*cols)
+
+    def _take(self, codes, positions):
+        if hasattr(codes, "take"):
+            return codes.take(positions).tolist()
+        return [codes[p] for p in positions]
+
+    def summarize(self, positions):
+        envs = self._take(self.env, positions)
+        servers = self._take(self.server, positions)
+        servers_by_env = defaultdict(set)
+        db_by_env = defaultdict(set)
+        for e, srv in set(zip(envs, servers)):
+            name = self.server_names[srv]
+            if name:
+                env = self.env_names[e]
+                servers_by_env[env].add(name)
+                if self.server_is_db[srv]:
+                    db_by_env[env].add(name)
+        return inventory_result(
+            {self.env_names[e] for e in set(envs)} - {"Unknown"},
+            servers_by_env,
+            {self.os_names[c] for c in set(self._take(self.os_name, positions))} - {""},
+            {self.os_versions[c] for c in set(self._take(self.os_version, positions))} - {""},
+            db_by_env,
+        )
+
+    def summarize_groups(self, groups):
+        """groups: {app key: row positions} -> {app key: summary}"""
+        return {key: self.summarize(positions) for key, positions in groups.items()}
+
+def _is_frame(data):
+    return hasattr(data, "columns") and hasattr(data, "to_numpy")
+
+def summarize(data, columns=COLUMNS):
+    """One summary over all rows (DataFrame or iterable of dicts)."""
+    data = data if _is_frame(data) else list(data)
+    if len(data) == 0:
+        return empty_result()
+    codes = InventoryCodes.from_frame(data, columns) if _is_frame(data) else InventoryCodes.from_rows(data, columns)
+    return codes.summarize(range(len(data)))
+
+def summarize_many(data, id_column="ESATS_ID", columns=COLUMNS, key=normalize_app_id):
+    """
+    {app key: summary} for every app in `data` (DataFrame or iterable of
+    dicts) in one pass. Rows are grouped on key(id cell), which folds IDs
+    the same way the extractor's lookups do; rows with a blank ID are skipped.
+    """
+    if _is_frame(data):
+        codes = InventoryCodes.from_frame(data, columns)
+        ids = data[id_column].to_numpy(dtype=object)
+    else:
+        data = list(data)
+        codes = InventoryCodes.from_rows(data, columns)
+        ids = [r.get(id_column) for r in data]
+    groups = defaultdict(list)
+    for pos, value in enumerate(ids):
+        if not is_na(value) and str(value).strip():
+            groups[key(value)].append(pos)
+    return codes.summarize_groups(groups)
@@ -0,0 +1,171 @@
+# server.py
+"""
+Server mode (--serve) for extract_app_data.py: keeps the compiled plan and
+indexed sources resident and answers per-app requests over HTTP or a Unix
+socket. Imported only when --serve is used; the HTTP machinery is imported
+only once serve() starts.
+"""
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+from extract_app_data import SOURCE_REGISTRY, document_header, document_keys, document_title, format_field, render_app
+
+class AppServer:
+    """
+    Keeps the compiled plan and the loaded, indexed sources resident and
+    answers per-app requests from them. A background thread polls the
+    source files; a changed workbook is re-parsed into a copy of the
+    registry that replaces the live one only after it loaded cleanly, so a
+    request in flight always sees one consistent set of sources.
+    """
+    def __init__(self, plan, registry=None, poll_seconds=2.0):
+        self.plan = plan
+        self.registry = registry if registry is not None else SOURCE_REGISTRY
+        self.poll_seconds = poll_seconds
+        self._reload_lock = threading.Lock()
+        self.plan.load(self.registry)
+        self._stamps = {path: self._stamp(path) for path in self._paths()}
+        self._failed = {}  # path -> stamp of a version that failed to load
+        self.loaded_at = dict.fromkeys(self._stamps, time.time())
+
+    def _paths(self):
+        return sorted({self.plan.sources[alias]["path"] for alias in self.plan.load_columns})
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def check_sources(self):
+        """Reload every source whose file changed since it was loaded; returns the reloaded paths."""
+        with self._reload_lock:
+            stamps = {path: self._stamp(path) for path in self._paths()}
+            changed = [path for path, stamp in stamps.items() if stamp not in (self._stamps.get(path), self._failed.get(path))]
+            if not changed:
+                return []
+            registry = self.registry.copy(drop_paths=changed)
+            try:
+                self.plan.load(registry)
+            except Exception:
+                # Keep serving the old sources; retry once the file changes again
+                self._failed.update((path, stamps[path]) for path in changed)
+                raise
+            self.registry = registry
+            for path in changed:
+                self._stamps[path] = stamps[path]
+                self.loaded_at[path] = time.time()
+            return changed
+
+    def watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                for path in self.check_sources():
+                    print(f"Reloaded {os.path.basename(path)}", file=sys.stderr)
+            except Exception as e:
+                print(f"WARNING: reload failed, still serving the previous data: {e}", file=sys.stderr)
+
+    def summary(self, app_id):
+        """
+        The same documents extract_fields() would write, returned instead of
+        written, plus each field's structured value (as in app_record()).
+        """
+        registry = self.registry  # one snapshot for the whole request
+        cfg = self.plan.cfg
+        app_name, sections = render_app(self.plan, app_id, registry, formatted=False)
+        docs = {key: [] for key in document_keys(self.plan)}
+        fields = []
+        for step, value in sections:
+            fields.append({"label": step.label, "file": step.emit_key, "aggregate": step.aggregate or "single", "value": value})
+            lines, _ = format_field(step.fld, value)
+            if step.emit_key not in docs:
+                continue
+            if not docs[step.emit_key]:
+                docs[step.emit_key].append(document_header(document_title(cfg, step.emit_key, app_id, app_name)))
+            docs[step.emit_key].extend(line + "\n" for line in lines)
+        return {
+            "app_id": app_id,
+            "app_name": app_name or "",
+            "fields": fields,
+            "documents": {key: "".join(parts) for key, parts in docs.items()},
+        }
+
+def serve(app_server, host="127.0.0.1", port=8765, socket_path=None):
+    """
+    GET  /apps/<id>          JSON: app name, every field's value, and each document's Markdown
+    GET  /apps/<id>/<file>   one document (main, servers, ...) as text/markdown
+    GET  /health             loaded sources and when they were (re)loaded
+    POST /reload             check the source files now instead of waiting for the poller
+    """
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import unquote, urlsplit
+
+    class Handler(BaseHTTPRequestHandler):
+        def address_string(self):
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def _send(self, status, body, content_type="application/json; charset=utf-8"):
+            data = (json.dumps(body, ensure_ascii=False) if content_type.startswith("application/json") else body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = [unquote(p) for p in urlsplit(self.path).path.split("/") if p]
+            try:
+                if parts == ["health"]:
+                    self._send(200, {"status": "ok", "sources": {
+                        path: datetime.datetime.fromtimestamp(t).isoformat(timespec="seconds")
+                        for path, t in app_server.loaded_at.items()
+                    }})
+                elif len(parts) == 2 and parts[0] == "apps":
+                    self._send(200, app_server.summary(parts[1]))
+                elif len(parts) == 3 and parts[0] == "apps":
+                    docs = app_server.summary(parts[1])["documents"]
+                    if parts[2] not in docs:
+                        self._send(404, {"error": f"Unknown file '{parts[2]}'. Available: {sorted(docs)}"})
+                    else:
+                        self._send(200, docs[parts[2]], "text/markdown; charset=utf-8")
+                else:
+                    self._send(404, {"error": "Not found. Try /apps/<id>, /apps/<id>/main or /health."})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def do_POST(self):
+            if urlsplit(self.path).path.rstrip("/") != "/reload":
+                self._send(404, {"error": "Not found."})
+                return
+            try:
+                self._send(200, {"reloaded": app_server.check_sources()})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+    if socket_path:
+        class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        httpd, where = ThreadingUnixHTTPServer(socket_path, Handler), f"unix:{socket_path}"
+    else:
+        httpd, where = ThreadingHTTPServer((host, port), Handler), f"http://{host}:{port}"
+
+    threading.Thread(target=app_server.watch, daemon=True).start()
+    print(f"Serving app summaries on {where} (Ctrl+C to stop).")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
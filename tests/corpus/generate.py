@@ -0,0 +1,120 @@
+# generate.py
+"""
+Rebuilds the regression corpus inputs: four small A-D workbooks, a config
+that exercises every aggregate, and an IDs file. Only needed when the
+corpus itself changes; the expected/ Markdown must then be re-rendered
+with a known-good extractor (see tests/test_corpus.py).
+
+    python tests/corpus/generate.py
+"""
+import json
+import os
+import random
+
+import openpyxl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+INPUTS = os.path.join(HERE, "inputs")
+SEED = 7
+APPS = 14
+
+def workbook(path, sheets):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, header, rows in sheets:
+        ws = wb.create_sheet(name)
+        ws.append(header)
+        for r in rows:
+            ws.append(r)
+    wb.save(path)
+
+def main():
+    rnd = random.Random(SEED)
+    os.makedirs(INPUTS, exist_ok=True)
+    ids = [f"{1000 + i}" for i in range(APPS)] + ["ab12", "X-9"]
+
+    def cell_id(i):
+        # the same ID typed as a number, padded, or in another case
+        r = rnd.random()
+        if i.isdigit() and r < 0.5:
+            return int(i)
+        if r < 0.7:
+            return f"  {i} "
+        return i.lower() if r < 0.85 else i
+
+    apps = []
+    for i in ids:
+        if rnd.random() < 0.1:
+            continue
+        apps.append([cell_id(i), f"App {i}" if rnd.random() > 0.1 else None, "desc\nline" if rnd.random() < 0.3 else "d",
+                     rnd.choice([1, 2, None, 3.5]), rnd.choice(["Mon, Tue", "Mon;Tue", None]),
+                     rnd.randint(1, 1000) if rnd.random() > 0.2 else None])
+    workbook(os.path.join(INPUTS, "A.xlsx"), [("Other", ["x"], [[1]]),
+             ("Apps", ["APPID", "BA_NAME", "BA_DESCRIPTION", "AVAIL", "DAYS", "# Users"], apps)])
+
+    envs = ["prod", "PRD", "Production", "test", "tst", "uat", "dev", "development", "Staging", None, "  qa "]
+    servers = []
+    for i in ids:
+        for _ in range(rnd.randint(0, 8)):
+            servers.append([cell_id(i), f"srv{rnd.choice(['db', 'app', 'web', 'sql', 'ora'])}{rnd.randint(1, 30):02d}",
+                            rnd.choice(envs), rnd.choice(["RHEL", "Windows", None, "AIX"]), rnd.choice(["7", "8.1", 2019, None, "N/A"])])
+    workbook(os.path.join(INPUTS, "B.xlsx"), [("All", ["ESATS_ID", "SERVER", "ENVIRONMENT", "OS_NAME", "OS_VERSION"], servers)])
+
+    dbs = []
+    for i in ids:
+        for _ in range(rnd.randint(0, 5)):
+            dbs.append([cell_id(i), f"dbh{rnd.randint(1, 9)}", rnd.choice(["Production", "Test", "Dev", None]),
+                        rnd.choice(["Oracle", "MSSQL", None]), rnd.choice(["19c", "2019", 12.2]), f"I{rnd.randint(1, 3)}",
+                        rnd.choice(["X, Y", "Z", None]), None if rnd.random() < 0.3 else rnd.randint(1, 9)])
+    workbook(os.path.join(INPUTS, "C.xlsx"), [("All", ["ESATS_ID", "SERVER", "PHASE", "DBMS", "DBMSVERSION", "INSTANCE", "DBNAME", "PATCHLEVEL"], dbs)])
+
+    links = [[cell_id(rnd.choice(ids)), cell_id(rnd.choice(ids)), rnd.choice(["file", "api"])] for _ in range(APPS * 3)]
+    workbook(os.path.join(INPUTS, "D.xlsx"), [("All", ["SEND_ESATS_ID", "REC_ESATS_ID", "TYPE"], links)])
+
+    cfg = {
+        "main_filename_template": "./output/{app}-{app_id}-{ts}.md",
+        "extra_files": {
+            "servers": {"title_template": "Server Inventory — {app_id}", "filename_template": "./output/{app}-{app_id}-{ts}-servers.md"},
+            "databases": {"title_template": "Database Inventory — {app}", "filename_template": "{app}-{app_id}-db.md"},
+        },
+        "doc_title_template": "Application Summary — {app_id}",
+        "app_name_field_label": "Application Name",
+        # paths are relative to this folder; the test points them at the checked-in inputs
+        "sources": {
+            "A": {"path": "inputs/A.xlsx", "sheet_name_default": "Apps", "id_column_default": "APPID"},
+            "B": {"path": "inputs/B.xlsx", "sheet_name_default": "All", "id_column_default": "ESATS_ID"},
+            "C": {"path": "inputs/C.xlsx", "sheet_name_default": "All", "id_column_default": "ESATS_ID"},
+            "D": {"path": "inputs/D.xlsx", "sheet_name_default": "All", "id_column_default": "SEND_ESATS_ID"},
+        },
+        "fields": [
+            {"label": "Description", "source": "A", "column": "BA_DESCRIPTION", "transform": "upper"},
+            {"label": "Application Name", "source": "A", "column": "BA_NAME"},
+            {"label": "Avail", "source": "A", "column": "AVAIL"},
+            {"label": "Days", "source": "A", "column": "DAYS", "split": ";", "join": " | "},
+            {"label": "Users", "source": "A", "column": "# Users"},
+            {"label": "Env Summary", "source": "B", "aggregate": "inventory_summary"},
+            {"label": "Database Servers by Environment", "source": "C", "aggregate": "group_by", "group_by_column": "PHASE",
+             "value_column": "SERVER", "style": "bulleted", "unique": True},
+            {"label": "Inline", "source": "C", "aggregate": "group_by", "group_by_column": "PHASE", "value_column": "DBMS",
+             "key_order": ["Production", "Test", "Nope"], "unique": False},
+            {"label": "DB Name", "source": "C", "column": "DBNAME", "aggregate": "unique_join", "split": ",", "join": "; "},
+            {"label": "Patch", "source": "C", "column": "PATCHLEVEL", "aggregate": "unique_join", "transform": "lower"},
+            {"label": "Downstream Dependencies", "source": "D", "aggregate": "dependencies", "match_column": "SEND_ESATS_ID",
+             "return_column": "REC_ESATS_ID", "join": ", "},
+            {"label": "Upstream Dependencies", "source": "D", "aggregate": "dependencies", "match_column": "REC_ESATS_ID",
+             "return_column": "SEND_ESATS_ID"},
+            {"label": "Server Inventory", "source": "B", "aggregate": "inventory_table", "emit_file": "servers",
+             "columns": ["SERVER", "ENVIRONMENT", "OS_NAME", "OS_VERSION"], "headers": {"SERVER": "Server"},
+             "sort_by": ["ENVIRONMENT", "SERVER"]},
+            {"label": "Database Inventory", "source": "C", "aggregate": "inventory_table", "emit_file": "databases",
+             "columns": ["SERVER", "PHASE", "DBMS", "DBMSVERSION", "INSTANCE", "DBNAME", "PATCHLEVEL"],
+             "sort_by": ["PHASE", "SERVER"], "env_column": "PHASE"},
+        ],
+    }
+    with open(os.path.join(HERE, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(cfg, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(HERE, "ids.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(ids + ["1003", " 1004 ", "nosuch"]) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# test_corpus.py
+"""
+Regression corpus: renders tests/corpus (four small A-D workbooks, a config
+using every aggregate, an IDs file with repeats and a missing ID) and
+compares every Markdown file with tests/corpus/expected/, byte for byte
+apart from the _Generated: line and the timestamps in folder/file names.
+
+The expected files were rendered by the original (pre-optimization)
+extractor. To re-render them with a known-good extractor:
+
+    python tests/test_corpus.py path/to/extract_app_data.py
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, "corpus")
+EXPECTED = os.path.join(CORPUS, "expected")
+SCRIPT = os.path.join(os.path.dirname(HERE), "extract_app_data.py")
+TIMESTAMP = re.compile(r"-(\d{8}-\d{6}|latest)")
+GENERATED = re.compile(r"^_Generated: .*_$", re.M)
+
+def write_config(workdir):
+    with open(os.path.join(CORPUS, "config.json"), "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    for src in cfg["sources"].values():
+        src["path"] = os.path.join(CORPUS, src["path"])
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, ensure_ascii=False)
+    return path
+
+def extract(workdir, *args, script=SCRIPT):
+    """Run the extractor on the corpus in `workdir`; returns its stdout."""
+    config = write_config(workdir)
+    cmd = [sys.executable, script, "--config", config] + list(args)
+    if "--app-id" not in args:
+        cmd += ["--ids-file", os.path.join(CORPUS, "ids.txt")]
+    return subprocess.run(cmd, cwd=workdir, check=True, capture_output=True, text=True).stdout
+
+def render(workdir, *args, script=SCRIPT):
+    """Run the extractor in `workdir`; {folder/file with timestamps removed: masked text}."""
+    extract(workdir, *args, script=script)
+    return collect(workdir)
+
+def collect(workdir):
+    docs = {}
+    out = os.path.join(workdir, "output")
+    for folder in sorted(os.listdir(out)):
+        if not os.path.isdir(os.path.join(out, folder)):
+            continue  # e.g. the --incremental manifest
+        for name in sorted(os.listdir(os.path.join(out, folder))):
+            with open(os.path.join(out, folder, name), "r", encoding="utf-8") as f:
+                text = GENERATED.sub("_Generated: X_", f.read())
+            docs[f"{TIMESTAMP.sub('', folder)}/{TIMESTAMP.sub('', name)}"] = text
+    return docs
+
+def expected():
+    docs = {}
+    for folder in sorted(os.listdir(EXPECTED)):
+        for name in sorted(os.listdir(os.path.join(EXPECTED, folder))):
+            with open(os.path.join(EXPECTED, folder, name), "r", encoding="utf-8") as f:
+                docs[f"{folder}/{name}"] = f.read()
+    return docs
+
+@pytest.mark.parametrize("args", [
+    [],
+    ["--per-id"],
+    ["--workers", "2"],
+    ["--write-threads", "4"],
+    ["--low-memory"],
+    ["--cache-dir", "cache"],
+    ["--incremental"],
+], ids=lambda args: " ".join(args) or "batch")
+def test_batch_matches_corpus(tmp_path, args):
+    assert render(str(tmp_path), *args) == expected()
+
+# Runs the extractor as if spawn were the only start method (as on Windows):
+# the plan, precomputed values and registry must pickle into the workers.
+SPAWN_DRIVER = f"""
+import multiprocessing, sys
+sys.path.insert(0, {os.path.dirname(SCRIPT)!r})
+import extract_app_data
+if __name__ == "__main__":
+    multiprocessing.get_all_start_methods = lambda: ["spawn"]
+    extract_app_data.main()
+"""
+
+def test_spawn_workers_match_corpus(tmp_path):
+    driver = tmp_path / "spawn_driver.py"
+    driver.write_text(SPAWN_DRIVER, encoding="utf-8")
+    assert render(str(tmp_path), "--workers", "2", script=str(driver)) == expected()
+
+def test_default_batch_streams_sections(tmp_path):
+    # the background writer (whole documents in memory) is opt-in
+    phases = extract(str(tmp_path), "--profile")
+    assert re.search(r"^  write +main ", phases, re.M)
+    assert not re.search(r"^  write +background ", phases, re.M)
+    assert collect(str(tmp_path)) == expected()
+
+def test_single_id_matches_corpus(tmp_path):
+    docs = render(str(tmp_path), "--app-id", "1004")
+    want = {k: v for k, v in expected().items() if k.split("/")[0].endswith("-1004")}
+    assert want and docs == want
+
+def test_cache_dir_warm_start_matches_corpus(tmp_path):
+    render(str(tmp_path), "--cache-dir", "cache")
+    os.rename(tmp_path / "output", tmp_path / "cold")
+    assert render(str(tmp_path), "--cache-dir", "cache") == expected()
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    script = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else SCRIPT
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = render(tmp, script=script)
+    shutil.rmtree(EXPECTED, ignore_errors=True)
+    for key, text in docs.items():
+        os.makedirs(os.path.join(EXPECTED, os.path.dirname(key)), exist_ok=True)
+        with open(os.path.join(EXPECTED, key), "w", encoding="utf-8") as f:
+            f.write(text)
+    print(f"Wrote {len(docs)} file(s) to {EXPECTED}")
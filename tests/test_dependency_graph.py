@@ -0,0 +1,134 @@
+# test_dependency_graph.py
+"""
+DependencyGraph on hand-built edges (depth limits, cycles, self-links,
+orientation), the plan sharing one graph between a field and its reverse
+on the regression corpus, and --export-graph JSON/CSV output.
+"""
+import csv
+import json
+import os
+import sys
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import extract_app_data  # noqa: E402
+from dependency_graph import DependencyGraph  # noqa: E402
+
+CORPUS = os.path.join(HERE, "corpus")
+
+# A -> B -> C -> A (a cycle), C -> D, D -> D (a self-link), a blank target
+ROWS = [
+    {"SEND": "a", "REC": "B"},
+    {"SEND": " A ", "REC": "b"},
+    {"SEND": "b", "REC": "C"},
+    {"SEND": "C", "REC": "a"},
+    {"SEND": "c", "REC": "D"},
+    {"SEND": "D", "REC": "D"},
+    {"SEND": "A", "REC": None},
+]
+
+def graph():
+    return DependencyGraph.from_rows(ROWS, "SEND", "REC")
+
+def test_neighbors_in_row_order_both_directions():
+    g = graph()
+    assert g.neighbors("A") == ["B", "b"]  # distinct spellings are kept, like the per-ID scan
+    assert g.neighbors(" c ") == ["a", "D"]
+    assert g.neighbors("A", "up") == ["C"]
+    assert g.neighbors("D", "up") == ["c", "D"]
+    assert g.neighbors("nosuch") == []
+
+def test_depth_limits():
+    g = graph()
+    assert g.walk("A", depth=1) == [("B", 1)]
+    assert g.walk("A", depth=2) == [("B", 1), ("C", 2)]
+    assert g.walk("A", depth=3) == [("B", 1), ("C", 2), ("D", 3)]
+    assert g.reach("A", depth=2) == ["B", "C"]
+    assert g.reach("D", "up", depth=2) == ["c", "D", "b"]
+
+def test_cycles_terminate_without_revisiting_the_start():
+    g = graph()
+    assert g.walk("B", depth=None) == [("C", 1), ("a", 2), ("D", 2)]
+    assert g.walk("A", "up", depth=None) == [("C", 1), ("b", 2)]  # b <- A leads back to the start
+
+def test_self_link_listed_at_every_depth():
+    g = graph()
+    assert g.reach("D", depth=1) == ["D"]
+    assert g.reach("D", depth=2) == ["D"]
+    assert g.reach("D", depth=None) == ["D"]
+    assert g.walk("D", "up", depth=None)[0] == ("c", 1)
+    assert ("D", 1) in g.walk("D", "up", depth=None)
+
+def test_from_frame_matches_from_rows():
+    df = pd.DataFrame(ROWS)
+    for key in (extract_app_data.normalize_id, lambda v: str(v).strip().lower()):
+        framed = DependencyGraph.from_frame(df, "SEND", "REC", key=key)
+        rowed = DependencyGraph.from_rows(ROWS, "SEND", "REC", key=key)
+        for app_id in ["a", "B", " c", "D", "nosuch"]:
+            for direction in ("down", "up"):
+                assert framed.walk(app_id, direction) == rowed.walk(app_id, direction)
+                assert framed.neighbors(app_id, direction) == rowed.neighbors(app_id, direction)
+
+def corpus_plan(depth=1):
+    with open(os.path.join(CORPUS, "config.json"), "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    for src in cfg["sources"].values():
+        src["path"] = os.path.join(CORPUS, src["path"])
+    for fld in cfg["fields"]:
+        if fld.get("aggregate") == "dependencies":
+            fld["depth"] = depth
+    return extract_app_data.compile_plan(cfg)
+
+def scan(df, match, ret, app_id):
+    # the original per-ID rule: rows whose match cell folds to app_id, stripped return cells
+    norm = extract_app_data.normalize_id
+    hits = df[df[match].map(norm) == norm(app_id)][ret].dropna()
+    return list(dict.fromkeys(str(v).strip() for v in hits if str(v).strip()))
+
+def test_fields_sharing_a_graph_keep_their_orientation():
+    plan = corpus_plan()
+    registry = extract_app_data.SourceRegistry()
+    plan.load(registry)
+    down, up = [s for s in plan.steps if s.aggregate == "dependencies"]
+    assert plan.dependency_graph(registry, down) is plan.dependency_graph(registry, up)
+    df = pd.read_excel(os.path.join(CORPUS, "inputs", "D.xlsx"))
+    ids = sorted({str(v).strip() for v in pd.concat([df["SEND_ESATS_ID"], df["REC_ESATS_ID"]])}) + ["nosuch"]
+    for app_id in ids:
+        assert plan.dependencies(registry, down, app_id) == scan(df, "SEND_ESATS_ID", "REC_ESATS_ID", app_id)
+        assert plan.dependencies(registry, up, app_id) == scan(df, "REC_ESATS_ID", "SEND_ESATS_ID", app_id)
+
+def test_multi_hop_fields_include_direct_neighbors():
+    norm = extract_app_data.normalize_id
+    registry = extract_app_data.SourceRegistry()
+    direct, deep = corpus_plan(1), corpus_plan("all")
+    direct.load(registry)
+    deep.load(registry)
+    for one, every in zip(direct.steps, deep.steps):
+        if one.aggregate != "dependencies":
+            continue
+        for app_id in ["1004", "1005", "ab12", "x-9"]:
+            near = set(map(norm, direct.dependencies(registry, one, app_id)))
+            far = list(map(norm, deep.dependencies(registry, every, app_id)))
+            assert near <= set(far) and len(far) == len(set(far))
+    down = [s for s in deep.steps if s.aggregate == "dependencies"][0]
+    assert "1004" in deep.dependencies(registry, down, "1004")  # its self-link, as at depth 1
+
+def test_export_json_and_csv(tmp_path):
+    plan = corpus_plan()
+    registry = extract_app_data.SourceRegistry()
+    n_json = extract_app_data.export_dependency_graphs(plan, str(tmp_path / "g.json"), registry)
+    n_csv = extract_app_data.export_dependency_graphs(plan, str(tmp_path / "g.csv"), registry)
+    with open(tmp_path / "g.json", "r", encoding="utf-8") as f:
+        graphs = json.load(f)["graphs"]
+    assert len(graphs) == 1  # the downstream and upstream fields share one graph
+    g = graphs[0]
+    assert (g["source"], g["sheet"], g["from_column"], g["to_column"]) == ("D", "All", "SEND_ESATS_ID", "REC_ESATS_ID")
+    assert n_json == n_csv == len(g["edges"]) == len({tuple(e) for e in g["edges"]})
+    assert {name for edge in g["edges"] for name in edge} <= set(g["nodes"])
+    with open(tmp_path / "g.csv", "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [[r["from_id"], r["to_id"]] for r in rows] == g["edges"]
+    assert {(r["source"], r["from_column"], r["to_column"]) for r in rows} == {("D", "SEND_ESATS_ID", "REC_ESATS_ID")}
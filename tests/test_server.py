@@ -0,0 +1,44 @@
+# test_server.py
+"""
+AppServer.summary() on the regression corpus: structured field values
+(as in --format jsonl) and the same Markdown the batch writes.
+"""
+import json
+import os
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import extract_app_data  # noqa: E402
+from server import AppServer  # noqa: E402
+
+CORPUS = os.path.join(HERE, "corpus")
+GENERATED = re.compile(r"^_Generated: .*_$", re.M)
+
+def corpus_server():
+    with open(os.path.join(CORPUS, "config.json"), "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    for src in cfg["sources"].values():
+        src["path"] = os.path.join(CORPUS, src["path"])
+    return AppServer(extract_app_data.compile_plan(cfg), extract_app_data.SourceRegistry())
+
+def test_summary_fields_match_app_record():
+    server = corpus_server()
+    summary = server.summary("1004")
+    record = extract_app_data.app_record(server.plan, "1004", server.registry)
+    assert summary["fields"] == record["fields"]
+    values = {f["label"]: f["value"] for f in summary["fields"]}
+    assert values["Env Summary"]["Environments"]  # inventory aggregates keep their data, not ""
+    assert set(values["Server Inventory"]) == {"headers", "rows"} and values["Server Inventory"]["rows"]
+    json.dumps(summary, ensure_ascii=False)
+
+def test_summary_documents_match_corpus():
+    summary = corpus_server().summary("1004")
+    folder = os.path.join(CORPUS, "expected", "App 1004-1004")
+    names = {"main": "App 1004-1004.md", "servers": "App 1004-1004-servers.md", "databases": "App 1004-1004-db.md"}
+    assert set(summary["documents"]) == set(names)
+    for key, name in names.items():
+        with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+            assert GENERATED.sub("_Generated: X_", summary["documents"][key]) == f.read()